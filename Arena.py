@@ -1,16 +1,95 @@
 import logging
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import numpy as np
 from tqdm import tqdm
 
 log = logging.getLogger(__name__)
 
+_workerArenas = None  # (arena, swapped arena) of an Arena worker process, see Arena.playGamesParallel
+
+
+def initArenaWorker(playerFactories, game):
+    global _workerArenas
+    player1, player2 = playerFactories[0](), playerFactories[1]()
+    _workerArenas = (Arena(player1, player2, game), Arena(player2, player1, game))
+
+
+def playArenaGame(swapped, seed):
+    """
+    Plays one game in an Arena worker process with random seed seed, with
+    player2 starting if swapped.
+
+    Returns:
+        result: the result of the game for player1, as in playGame
+    """
+    np.random.seed(seed)
+    if swapped:
+        return -_workerArenas[1].playGame()
+    return _workerArenas[0].playGame()
+
+
+class SPRT():
+    """
+    Sequential probability ratio test of H0: the challenger is elo0 Elo
+    stronger than its opponent, against H1: it is elo1 Elo stronger, with
+    false acceptance rate alpha and false rejection rate beta.
+
+    The log-likelihood ratio uses the normal approximation of the game
+    score (1 for a win, 1/2 for a draw), so draws are taken into account.
+    The variance of the score is estimated with prior pseudo-games of every
+    result added, so that a clean sweep still moves the ratio.
+    """
+
+    PRIOR = 0.5  # pseudo-games of every result in the variance estimate
+
+    def __init__(self, elo0=0, elo1=70, alpha=0.05, beta=0.05):
+        self.s0 = self.expectedScore(elo0)
+        self.s1 = self.expectedScore(elo1)
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    @staticmethod
+    def expectedScore(elo):
+        return 1 / (1 + 10 ** (-elo / 400))
+
+    def llr(self, wins, losses, draws):
+        """
+        Returns:
+            llr: the log-likelihood ratio of H1 against H0 for the challenger's
+                 results, 0 before any game
+        """
+        n = wins + losses + draws
+        if n == 0:
+            return 0.0
+        mean = (wins + draws / 2) / n
+        m = n + 3 * self.PRIOR
+        priorMean = (wins + self.PRIOR + (draws + self.PRIOR) / 2) / m
+        var = (wins + self.PRIOR + (draws + self.PRIOR) / 4) / m - priorMean ** 2
+        return n * (self.s1 - self.s0) * (2 * mean - self.s0 - self.s1) / (2 * var)
+
+    def status(self, wins, losses, draws):
+        """
+        Returns:
+            status: 'accept' once H1 is accepted, 'reject' once H0 is
+                    accepted, None while the test is undecided
+        """
+        llr = self.llr(wins, losses, draws)
+        if llr >= self.upper:
+            return 'accept'
+        if llr <= self.lower:
+            return 'reject'
+        return None
+
 
 class Arena():
     """
     An Arena class where any 2 agents can be pit against each other.
     """
 
-    def __init__(self, player1, player2, game, display=None):
+    def __init__(self, player1, player2, game, display=None, playerFactories=None, workers=0):
         """
         Input:
             player 1,2: two functions that takes board as input, return action
@@ -18,6 +97,11 @@ class Arena():
             display: a function that takes board as input and prints it (e.g.
                      display in othello/OthelloGame). Is necessary for verbose
                      mode.
+            playerFactories: optional pair of picklable callables without
+                             arguments that build player 1 and 2 (e.g. by
+                             loading a checkpoint). Together with workers > 1
+                             they let playGames spread the games over that
+                             many processes.
 
         see othello/OthelloPlayers.py for an example. See pit.py for pitting
         human players/other baselines with each other.
@@ -26,6 +110,8 @@ class Arena():
         self.player2 = player2
         self.game = game
         self.display = display
+        self.playerFactories = playerFactories
+        self.workers = workers
 
     def playGame(self, verbose=False):
         """
@@ -62,16 +148,19 @@ class Arena():
             self.display(board)
         return curPlayer * self.game.getGameEnded(board, curPlayer)
 
-    def playGames(self, num, verbose=False):
+    def playGames(self, num, verbose=False, seed=0):
         """
         Plays num games in which player1 starts num/2 games and player2 starts
-        num/2 games.
+        num/2 games. seed is the base of the random seeds of the games played
+        in worker processes, see playGamesParallel.
 
         Returns:
             oneWon: games won by player1
             twoWon: games won by player2
             draws:  games won by nobody
         """
+        if self.workers > 1 and self.playerFactories is not None and not verbose:
+            return self.playGamesParallel(num, seed)
 
         num = int(num / 2)
         oneWon = 0
@@ -98,3 +187,74 @@ class Arena():
                 draws += 1
 
         return oneWon, twoWon, draws
+
+    def playGamesParallel(self, num, seed=0):
+        """
+        Plays the games of playGames, with the same split of who starts, in a
+        pool of self.workers processes. Every worker builds its own pair of
+        players with self.playerFactories and plays its games with them, so
+        the players never have to be pickled. Game i is played with a random
+        seed derived from (seed, i), so passing a different base seed, e.g.
+        the training iteration, gives every round its own random streams.
+
+        Returns:
+            oneWon: games won by player1
+            twoWon: games won by player2
+            draws:  games won by nobody
+        """
+        num = int(num / 2)
+        oneWon = 0
+        twoWon = 0
+        draws = 0
+        with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=initArenaWorker,
+                                 initargs=(self.playerFactories, self.game)) as pool:
+            seeds = np.random.SeedSequence(seed).generate_state(2 * num)
+            futures = [pool.submit(playArenaGame, i >= num, int(seeds[i])) for i in range(2 * num)]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Arena.playGames"):
+                gameResult = future.result()
+                if gameResult == 1:
+                    oneWon += 1
+                elif gameResult == -1:
+                    twoWon += 1
+                else:
+                    draws += 1
+
+        return oneWon, twoWon, draws
+
+    def playGamesSPRT(self, num, sprt, verbose=False):
+        """
+        Plays at most num games, alternating which player starts, and stops
+        after a pair of games as soon as sprt decides whether player2 (the
+        challenger) is stronger than player1.
+
+        Returns:
+            oneWon: games won by player1
+            twoWon: games won by player2
+            draws:  games won by nobody
+            status: the decision of sprt, None if it was still undecided
+        """
+        oneWon = 0
+        twoWon = 0
+        draws = 0
+        status = None
+        players = (self.player1, self.player2)
+        for i in tqdm(range(int(num / 2) * 2), desc="Arena.playGames (SPRT)"):
+            swapped = i % 2 == 1
+            self.player1, self.player2 = players[::-1] if swapped else players
+            gameResult = self.playGame(verbose=verbose)
+            if swapped:
+                gameResult = -gameResult
+            if gameResult == 1:
+                oneWon += 1
+            elif gameResult == -1:
+                twoWon += 1
+            else:
+                draws += 1
+            if swapped:
+                status = sprt.status(twoWon, oneWon, draws)
+                if status is not None:
+                    break
+        self.player1, self.player2 = players
+
+        return oneWon, twoWon, draws, status
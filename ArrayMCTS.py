@@ -0,0 +1,304 @@
+import logging
+
+import numpy as np
+
+from MCTS import MCTS, maskedPolicy, puctAction
+from utils import dotdict
+
+log = logging.getLogger(__name__)
+
+
+class Node():
+    """
+    One state of the search tree. The edge statistics of the state are kept in
+    contiguous numpy arrays indexed by action instead of one dict entry per
+    (s,a) pair.
+    """
+    __slots__ = ('board', 'key', 'E', 'valids', 'P', 'N', 'W', 'Q', 'Ns', 'children')
+
+    def __init__(self, board, key, E):
+        self.board = board  # canonical board of this state, to expand children without replaying the path
+        self.key = key  # hashKey of board
+        self.E = E  # game.getGameEnded for this state
+        self.valids = None  # game.getValidMoves for this state
+        self.P = None  # initial policy (returned by neural net), None until expanded
+        self.N = None  # #times each edge was visited
+        self.W = None  # total value backed up through each edge
+        self.Q = None  # mean value of each edge (as defined in the paper)
+        self.Ns = 0  # #times this state was visited
+        self.children = {}  # action -> child Node, filled in as edges are taken
+
+    def expand(self, P, valids):
+        self.P = P
+        self.valids = valids
+        self.N = np.zeros(len(P), dtype=np.int64)
+        self.W = np.zeros(len(P), dtype=np.float64)
+        self.Q = np.zeros(len(P), dtype=np.float64)
+
+    def nbytes(self):
+        """
+        Returns the number of bytes held by this node's arrays and board.
+        """
+        total = self.board.nbytes if isinstance(self.board, np.ndarray) else 0
+        if self.P is not None:
+            total += self.P.nbytes + self.N.nbytes + self.W.nbytes + self.Q.nbytes + np.asarray(self.valids).nbytes
+        return total
+
+
+class ArrayMCTS(MCTS):
+    """
+    Drop-in replacement for MCTS that stores one Node per state, linked to its
+    children, instead of six dicts keyed by state. Child selection and policy
+    masking are shared with MCTS (puctAction, maskedPolicy).
+
+    Every node keeps its canonical board, so a descent follows child links
+    and only calls game.getNextState for the one new edge at its end, while
+    MCTS regenerates the board at every ply. That costs a board per node (the
+    bytes/node gap in benchmarks/mcts_tree.py) and buys about one
+    getNextState per simulation instead of the depth of the descent, which
+    is what pays off for games with expensive moves like Othello. The links
+    also let reroot free unreachable nodes without replaying any move.
+
+    Nodes are shared between transpositions through a table keyed by
+    game.hashKey (or game.stringRepresentation), so the same state is still
+    only evaluated once.
+
+    With args.mctsBatchSize > 1 the search collects that many leaves per step,
+    steering later descents away from pending leaves with a virtual loss of
+    args.virtualLoss (default 1), and evaluates all of them with a single
+    nnet.predict_batch call.
+
+    With args.reuseTree the tree is re-rooted at the board passed to
+    getActionProb: the statistics below it are kept and every node that can no
+    longer be reached from it is freed, so memory stays bounded over a game.
+    """
+
+    def __init__(self, game, nnet, args):
+        self.game = game
+        self.nnet = nnet
+        self.args = args
+        self.hashKey = getattr(game, 'hashKey', None) or game.stringRepresentation
+        self.incrementalKeys = hasattr(game, 'getNextHashKey') and hasattr(game, 'getCanonicalHashKey')
+        self.symmetric = getattr(args, 'symmetricSearch', False)
+        self.Ss = {}  # hashKey -> (key, board) of the symmetric representative, see MCTS.representative
+        self.nodes = {}  # hashKey -> Node
+        self.searchStats = dotdict({'simulations': 0, 'skipped': 0, 'seconds': 0.0, 'timedOut': False})  # of the last getActionProb
+
+    def getNode(self, canonicalBoard, s=None):
+        """
+        Returns the Node for canonicalBoard (with key s if it is already
+        known), creating an unexpanded one if the state has not been seen
+        before.
+        """
+        if s is None:
+            s = self.hashKey(canonicalBoard)
+        if self.symmetric:
+            s, canonicalBoard = self.representative(canonicalBoard, s)
+        node = self.nodes.get(s)
+        if node is None:
+            node = Node(canonicalBoard, s, self.game.getGameEnded(canonicalBoard, 1))
+            self.nodes[s] = node
+        return node
+
+    def reroot(self, canonicalBoard):
+        """
+        Promotes the node of canonicalBoard to be the root of the tree and frees
+        every node that is not reachable from it. If the board is not in the
+        tree yet, the whole tree is dropped.
+
+        Returns:
+            freed: the number of nodes that were removed
+        """
+        root = self.getNode(canonicalBoard)
+        reachable = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if id(node) not in reachable:
+                reachable.add(id(node))
+                stack.extend(node.children.values())
+
+        freed = len(self.nodes) - len(reachable)
+        self.nodes = {s: node for s, node in self.nodes.items() if id(node) in reachable}
+        self.Ss = {s: rep for s, rep in self.Ss.items() if rep[0] in self.nodes}
+        log.debug(f'Re-rooted search tree, kept {len(self.nodes)} nodes and freed {freed}')
+        return freed
+
+    def edgeCounts(self, s):
+        node = self.nodes.get(s)
+        return None if node is None else node.N
+
+    def evaluate(self, node):
+        """
+        Expands node with the policy and value predicted by the neural network.
+
+        Returns:
+            v: the value of the node for the current player
+        """
+        P, v = self.nnet.predict(node.board)
+        return self.expandNode(node, P, v)
+
+    def expandNode(self, node, P, v):
+        """
+        Expands node with the network output P, v, masking invalid moves.
+
+        Returns:
+            v: the value of the node for the current player
+        """
+        valids = self.game.getValidMoves(node.board, 1)
+        P = maskedPolicy(P, valids)
+        node.expand(P, valids)
+        return np.asarray(v).item()
+
+    def selectAction(self, node):
+        """
+        Returns the valid action with the highest upper confidence bound, see
+        puctAction.
+        """
+        return puctAction(node.Q, node.N, node.P, node.Ns, node.valids, self.args.cpuct)
+
+    def getChild(self, node, a):
+        child = node.children.get(a)
+        if child is None:
+            next_s, next_player = self.game.getNextState(node.board, 1, a)
+            next_s = self.game.getCanonicalForm(next_s, next_player)
+            child = self.getNode(next_s, self.childKey(node.key, node.board, a, next_player, next_s))
+            node.children[a] = child
+        return child
+
+    def simulate(self, canonicalBoard, remaining):
+        batchSize = getattr(self.args, 'mctsBatchSize', 1)
+        if batchSize <= 1:
+            self.search(canonicalBoard)
+            return 1
+        return self.searchBatch(canonicalBoard, min(batchSize, remaining))
+
+    def search(self, canonicalBoard):
+        """
+        This function performs one iteration of MCTS, see MCTS.search. The
+        tree is descended iteratively and the visited (node, action) pairs are
+        kept on a path stack that is unwound to back up the leaf value.
+
+        Returns:
+            v: the negative of the value of the current canonicalBoard
+        """
+        node = self.getNode(canonicalBoard)
+        path = []
+        while True:
+            if node.E != 0:
+                # terminal node
+                v = -node.E
+                break
+            if node.P is None:
+                # leaf node
+                v = -self.evaluate(node)
+                break
+            a = self.selectAction(node)
+            path.append((node, a))
+            node = self.getChild(node, a)
+
+        for node, a in reversed(path):
+            node.Q[a] = (node.N[a] * node.Q[a] + v) / (node.N[a] + 1)
+            node.W[a] += v
+            node.N[a] += 1
+            node.Ns += 1
+            v = -v
+        return v
+
+    def searchBatch(self, canonicalBoard, batchSize):
+        """
+        Performs up to batchSize iterations of MCTS whose leaves are evaluated
+        together in one nnet.predict_batch call.
+
+        Returns:
+            n: the number of iterations that were performed
+        """
+        pending, done = self.collectLeaves(canonicalBoard, batchSize)
+        if pending:
+            pis, vs = self.nnet.predict_batch([leaf.board for leaf, _ in pending])
+            self.expandLeaves(pending, pis, vs)
+        return len(pending) + done
+
+    def collectLeaves(self, canonicalBoard, batchSize):
+        """
+        Descends the tree from canonicalBoard up to batchSize times and
+        returns the leaves that need a network evaluation, so the caller can
+        evaluate them in one batch (possibly together with the leaves of other
+        trees) and hand the results to expandLeaves.
+
+        Every edge on a descent gets a virtual loss right away, so following
+        descents prefer other branches. A descent that ends in a terminal
+        state is backed up immediately; one that reaches a leaf that is already
+        pending stops the collection early.
+
+        Returns:
+            pending: a list of (leaf, path) waiting for an evaluation
+            done: the number of descents that were already backed up
+        """
+        virtualLoss = getattr(self.args, 'virtualLoss', 1.0)
+        root = self.getNode(canonicalBoard)
+        pending = []  # (leaf, path)
+        done = 0
+
+        while len(pending) + done < batchSize:
+            node = root
+            path = []
+            while node.E == 0 and node.P is not None:
+                a = self.selectAction(node)
+                path.append((node, a))
+                self.addVirtualLoss(node, a, virtualLoss)
+                node = self.getChild(node, a)
+
+            if node.E != 0:
+                # terminal node
+                self.backupBatch(path, -node.E, virtualLoss)
+                done += 1
+            elif any(leaf is node for leaf, _ in pending):
+                # collision with a pending leaf, evaluate what we have
+                for n, a in path:
+                    self.revertVirtualLoss(n, a, virtualLoss)
+                break
+            else:
+                pending.append((node, path))
+        return pending, done
+
+    def expandLeaves(self, pending, pis, vs):
+        """
+        Expands the leaves returned by collectLeaves with their network
+        outputs and backs the values up their paths.
+        """
+        virtualLoss = getattr(self.args, 'virtualLoss', 1.0)
+        for (leaf, path), P, v in zip(pending, pis, vs):
+            self.backupBatch(path, -self.expandNode(leaf, P, v), virtualLoss)
+
+    @staticmethod
+    def addVirtualLoss(node, a, virtualLoss):
+        node.N[a] += 1
+        node.W[a] -= virtualLoss
+        node.Q[a] = node.W[a] / node.N[a]
+        node.Ns += 1
+
+    @staticmethod
+    def revertVirtualLoss(node, a, virtualLoss):
+        node.N[a] -= 1
+        node.W[a] += virtualLoss
+        node.Q[a] = node.W[a] / node.N[a] if node.N[a] > 0 else 0
+        node.Ns -= 1
+
+    @staticmethod
+    def backupBatch(path, v, virtualLoss):
+        """
+        Replaces the virtual loss on every edge of path by the real value v,
+        which is negated at every ply like in search.
+        """
+        for node, a in reversed(path):
+            # the visit was already counted when the virtual loss was added
+            node.W[a] += virtualLoss + v
+            node.Q[a] = node.W[a] / node.N[a]
+            v = -v
+
+    def nbytes(self):
+        """
+        Returns the number of bytes held by the arrays and boards of all nodes.
+        """
+        return sum(node.nbytes() for node in self.nodes.values())
@@ -0,0 +1,159 @@
+import queue
+import threading
+
+import numpy as np
+
+
+class BatchStream():
+    """
+    Shuffled mini-batches of training examples for the Keras model.fit,
+    assembled by a background thread while the model trains on the previous
+    ones.
+
+    Only the batches waiting in the prefetch queue are held as dense arrays,
+    instead of the whole example list, so memory stays bounded by
+    prefetch * batchSize examples however large the history is. examples can
+    be a list of (board, pi, v) tuples, or anything with a gather method like
+    ExampleArrays or a ReplayBuffer, whose arrays are then gathered from
+    directly.
+
+    With replacement, every epoch is len(examples) // batchSize batches of
+    examples drawn uniformly with replacement, like the pytorch wrappers
+    sample them, instead of one pass over a permutation.
+    """
+
+    def __init__(self, examples, batchSize, epochs, augment=None, transform=None, prefetch=4, dtype=None,
+                 replacement=False):
+        """
+        Input:
+            examples: the training examples
+            batchSize: the number of examples per batch
+            epochs: the number of passes over the examples
+            augment: optional function (boards, pis) -> (boards, pis) applied
+                     to every batch, e.g. NeuralNet.augmentBatch
+            transform: optional function mapping the array of boards of a
+                       batch to the network input
+            prefetch: the number of batches prepared ahead
+            dtype: optional dtype the arrays of every batch are cast to
+            replacement: sample the batches with replacement
+        """
+        self.examples = examples
+        self.batchSize = batchSize
+        self.epochs = epochs
+        self.augment = augment
+        self.transform = transform
+        self.prefetch = prefetch
+        self.dtype = dtype
+        self.replacement = replacement
+
+    def __len__(self):
+        # batches per epoch
+        if self.replacement:
+            return len(self.examples) // self.batchSize
+        return max(1, -(-len(self.examples) // self.batchSize))
+
+    def epoch(self):
+        """
+        Returns:
+            batches: the example ids of every batch of one epoch
+        """
+        if self.replacement:
+            return [np.sort(np.random.randint(len(self.examples), size=self.batchSize)) for _ in range(len(self))]
+        order = np.random.permutation(len(self.examples))
+        return [np.sort(order[start:start + self.batchSize]) for start in range(0, len(order), self.batchSize)]
+
+    def batch(self, ids):
+        """
+        Returns:
+            boards, pis, vs: the arrays of the examples with the given ids
+        """
+        if hasattr(self.examples, 'gather'):
+            boards, pis, vs = self.examples.gather(ids)
+        else:
+            boards, pis, vs = zip(*[self.examples[i] for i in ids])
+        if self.augment is not None:
+            boards, pis = self.augment(boards, pis)
+        boards = np.asarray(boards)
+        if self.transform is not None:
+            boards = self.transform(boards)
+        return (np.asarray(boards, dtype=self.dtype), np.asarray(pis, dtype=self.dtype),
+                np.asarray(vs, dtype=self.dtype))
+
+    @staticmethod
+    def put(batches, item, stop):
+        """
+        Puts item on the queue unless the consumer stops first.
+
+        Returns:
+            put: whether item was put
+        """
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(self, batches, stop):
+        try:
+            for _ in range(self.epochs):
+                for ids in self.epoch():
+                    boards, pis, vs = self.batch(ids)
+                    if not self.put(batches, (boards, [pis, vs]), stop):
+                        return
+        except Exception as e:
+            self.put(batches, e, stop)  # raised again by the consumer
+            return
+        self.put(batches, None, stop)
+
+    def __iter__(self):
+        """
+        Yields (boards, [pis, vs]) for every batch of every epoch, the format
+        model.fit expects from a generator.
+        """
+        batches = queue.Queue(self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(target=self.produce, args=(batches, stop), daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+
+class ExampleArrays():
+    """
+    A list of (board, pi, v) examples packed once into preallocated arrays of
+    dtype, so that a batch is gathered with one indexing operation per array
+    instead of being zipped and converted example by example.
+    """
+
+    def __init__(self, examples, dtype=np.float32):
+        board, pi, _ = examples[0]
+        self.boards = np.empty((len(examples),) + np.shape(board), dtype=dtype)
+        self.pis = np.empty((len(examples), len(pi)), dtype=dtype)
+        self.vs = np.empty(len(examples), dtype=dtype)
+        for i, (board, pi, v) in enumerate(examples):
+            self.boards[i] = board
+            self.pis[i] = pi
+            self.vs[i] = v
+
+    def __len__(self):
+        return len(self.vs)
+
+    def __getitem__(self, i):
+        return self.boards[i], self.pis[i], self.vs[i]
+
+    def gather(self, ids):
+        """
+        Returns:
+            boards, pis, vs: arrays with the examples with the given ids
+        """
+        return self.boards[ids], self.pis[ids], self.vs[ids]
@@ -0,0 +1,101 @@
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from NeuralNet import NeuralNet
+
+log = logging.getLogger(__name__)
+
+
+class CachedNNet(NeuralNet):
+    """
+    Wraps a NeuralNet with a bounded LRU cache of (policy, value) evaluations.
+
+    Entries are keyed by the model version and game.hashKey (or
+    game.stringRepresentation) of the canonical board, so one CachedNNet can be
+    shared by every MCTS built on the same network: all self-play episodes of
+    an iteration and the Arena games reuse each other's evaluations.
+
+    Changing the weights through train or load_checkpoint bumps the model
+    version and clears the cache. Any other attribute is looked up on the
+    wrapped network.
+    """
+
+    def __init__(self, nnet, game, maxSize):
+        self.nnet = nnet
+        self.hashKey = getattr(game, 'hashKey', None) or game.stringRepresentation
+        self.maxSize = maxSize
+        self.cache = OrderedDict()  # (version, hashKey) -> (pi, v)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # only called for attributes that CachedNNet does not define itself
+        return getattr(self.__dict__['nnet'], name)
+
+    def lookup(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return entry
+
+    def store(self, key, entry):
+        self.cache[key] = entry
+        if len(self.cache) > self.maxSize:
+            self.cache.popitem(last=False)
+
+    def predict(self, board):
+        key = (self.version, self.hashKey(board))
+        entry = self.lookup(key)
+        if entry is None:
+            entry = self.nnet.predict(board)
+            self.store(key, entry)
+        return entry
+
+    def predict_batch(self, boards):
+        keys = [(self.version, self.hashKey(board)) for board in boards]
+        entries = [self.lookup(key) for key in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            pis, vs = self.nnet.predict_batch([boards[i] for i in missing])
+            for i, pi, v in zip(missing, pis, vs):
+                entries[i] = (pi, v)
+                self.store(keys[i], entries[i])
+        pis, vs = zip(*entries)
+        return np.array(pis), np.array(vs).reshape(-1)
+
+    def hitRate(self):
+        """
+        Returns:
+            rate: the fraction of lookups answered from the cache since the last
+                  resetStats, 0 if there were none
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """
+        Drops every cached evaluation; called whenever the weights change.
+        """
+        self.version += 1
+        self.cache.clear()
+
+    def train(self, examples):
+        self.nnet.train(examples)
+        self.invalidate()
+
+    def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
+        self.nnet.save_checkpoint(folder=folder, filename=filename)
+
+    def load_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
+        self.nnet.load_checkpoint(folder=folder, filename=filename)
+        self.invalidate()
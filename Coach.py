@@ -1,18 +1,129 @@
 import logging
+import multiprocessing
 import os
+import random
 import sys
+import time
 from collections import deque
-from pickle import Pickler, Unpickler
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pickle import Unpickler
 from random import shuffle
 
 import numpy as np
 from tqdm import tqdm
 
-from Arena import Arena
+from Arena import Arena, SPRT
+from ArrayMCTS import ArrayMCTS
+from CachedNNet import CachedNNet
+from ExampleStore import ExampleStore
 from MCTS import MCTS
+from ReplayBuffer import ReplayBuffer
+from utils import dotdict
 
 log = logging.getLogger(__name__)
 
+_workerCoach = None  # the Coach of a self-play worker process, see Coach.selfPlayInWorkers
+_workerCheckpoint = None  # the checkpoint the network of _workerCoach was loaded from
+
+
+def initSelfPlayWorker(game, nnetClass, args, folder, filename):
+    global _workerCoach, _workerCheckpoint
+    nnet = nnetClass(game)
+    nnet.load_checkpoint(folder=folder, filename=filename)
+    # the replay buffer belongs to the parent, workers only play episodes
+    _workerCoach = Coach(game, nnet, dotdict(args, replayBufferSize=0))
+    _workerCheckpoint = filename
+
+
+def selfPlayWorker(seed, filename=None):
+    """
+    Plays one episode of self-play in a worker process, seeding the random
+    generators first so the episode only depends on seed. If filename is
+    given and differs from the checkpoint the worker network was loaded from,
+    the network is reloaded from it first.
+
+    Returns:
+        boards, pis, vs: the examples of executeEpisode stacked into three
+                         arrays, which are much cheaper to send back to the
+                         parent than a list of tuples
+    """
+    global _workerCheckpoint
+    if filename is not None and filename != _workerCheckpoint:
+        _workerCoach.nnet.load_checkpoint(folder=_workerCoach.args.checkpoint, filename=filename)
+        _workerCheckpoint = filename
+    random.seed(seed)
+    np.random.seed(seed)
+    _workerCoach.mcts = _workerCoach.mctsClass(_workerCoach.game, _workerCoach.nnet, _workerCoach.args)
+    boards, pis, vs = zip(*_workerCoach.executeEpisode())
+    return np.array(boards), np.array(pis), np.array(vs)
+
+
+def makeSPRT(args):
+    return SPRT(getattr(args, 'sprtElo0', 0), getattr(args, 'sprtElo1', 70),
+                getattr(args, 'sprtAlpha', 0.05), getattr(args, 'sprtBeta', 0.05))
+
+
+def isAccepted(args, pwins, nwins, decision):
+    """
+    Returns:
+        accepted: whether the new network passes gating, by the SPRT decision
+                  if there is one and by args.updateThreshold otherwise
+    """
+    if decision is not None:
+        return decision == 'accept'
+    return pwins + nwins > 0 and float(nwins) / (pwins + nwins) >= args.updateThreshold
+
+
+def gateCandidate(game, nnetClass, args, bestFile, candidateFile):
+    """
+    Pits the network saved in candidateFile against the one in bestFile in a
+    gating process, see Coach.learnPipelined, and saves the candidate as
+    best.pth.tar if it is accepted.
+
+    Returns:
+        pwins, nwins, draws: the games won by the previous and the candidate
+                             network, and the draws
+        accepted: whether the candidate was accepted
+    """
+    pnet, nnet = nnetClass(game), nnetClass(game)
+    pnet.load_checkpoint(folder=args.checkpoint, filename=bestFile)
+    nnet.load_checkpoint(folder=args.checkpoint, filename=candidateFile)
+    mctsClass = ArrayMCTS if getattr(args, 'arrayMCTS', False) else MCTS
+    pmcts, nmcts = mctsClass(game, pnet, args), mctsClass(game, nnet, args)
+    arena = Arena(lambda x: np.argmax(pmcts.getActionProb(x, temp=0)),
+                  lambda x: np.argmax(nmcts.getActionProb(x, temp=0)), game)
+    decision = None
+    if getattr(args, 'sprt', False):
+        pwins, nwins, draws, decision = arena.playGamesSPRT(args.arenaCompare, makeSPRT(args))
+    else:
+        pwins, nwins, draws = arena.playGames(args.arenaCompare)
+    accepted = isAccepted(args, pwins, nwins, decision)
+    if accepted:
+        nnet.save_checkpoint(folder=args.checkpoint, filename='best.pth.tar')
+    return pwins, nwins, draws, accepted
+
+
+class MCTSPlayerFactory():
+    """
+    Picklable recipe for an Arena player: builds a network of class nnetClass,
+    loads it from folder/filename and plays the greedy move of an MCTS on it.
+    """
+
+    def __init__(self, game, nnetClass, args, folder, filename):
+        self.game = game
+        self.nnetClass = nnetClass
+        self.args = args
+        self.folder = folder
+        self.filename = filename
+
+    def __call__(self):
+        nnet = self.nnetClass(self.game)
+        nnet.load_checkpoint(folder=self.folder, filename=self.filename)
+        mctsClass = ArrayMCTS if getattr(self.args, 'arrayMCTS', False) else MCTS
+        mcts = mctsClass(self.game, nnet, self.args)
+        return lambda x: np.argmax(mcts.getActionProb(x, temp=0))
+
 
 class Coach():
     """
@@ -25,8 +136,19 @@ class Coach():
         self.nnet = nnet
         self.pnet = self.nnet.__class__(self.game)  # the competitor network
         self.args = args
-        self.mcts = MCTS(self.game, self.nnet, self.args)
+        cacheSize = getattr(self.args, 'evalCacheSize', 0)
+        if cacheSize:
+            # share network evaluations across episodes and Arena games
+            self.nnet = CachedNNet(self.nnet, self.game, cacheSize)
+            self.pnet = CachedNNet(self.pnet, self.game, cacheSize)
+        if getattr(self.args, 'lazySymmetries', False):
+            self.baseNNet().symmetryGame = self.game
+        self.mctsClass = ArrayMCTS if getattr(self.args, 'arrayMCTS', False) else MCTS
+        self.mcts = self.mctsClass(self.game, self.nnet, self.args)
         self.trainExamplesHistory = []  # history of examples from args.numItersForTrainExamplesHistory latest iterations
+        bufferSize = getattr(self.args, 'replayBufferSize', 0)
+        # replaces trainExamplesHistory if set
+        self.replayBuffer = ReplayBuffer(os.path.join(self.args.checkpoint, 'replay'), bufferSize) if bufferSize else None
         self.skipFirstSelfPlay = False  # can be overriden in loadTrainExamples()
 
     def executeEpisode(self):
@@ -56,8 +178,7 @@ class Coach():
             temp = int(episodeStep < self.args.tempThreshold)
 
             pi = self.mcts.getActionProb(canonicalBoard, temp=temp)
-            sym = self.game.getSymmetries(canonicalBoard, pi)
-            for b, p in sym:
+            for b, p in self.getExampleSymmetries(canonicalBoard, pi):
                 trainExamples.append([b, self.curPlayer, p, None])
 
             action = np.random.choice(len(pi), p=pi)
@@ -68,6 +189,156 @@ class Coach():
             if r != 0:
                 return [(x[0], x[2], r * ((-1) ** (x[1] != self.curPlayer))) for x in trainExamples]
 
+    def executeEpisodes(self, numGames):
+        """
+        Plays numGames episodes of self-play side by side, each with its own
+        ArrayMCTS tree. At every search step the pending leaves of all the
+        games are evaluated together in one nnet.predict_batch call, so the
+        network gets batches of numGames boards (times args.mctsBatchSize)
+        instead of one board per call. Moves are chosen as in executeEpisode;
+        args.mctsTimeBudget and args.earlyStop are not used.
+
+        Returns:
+            trainExamples: the examples of all the games, in the format of
+                           executeEpisode
+        """
+        games = [dotdict({'board': self.game.getInitBoard(), 'curPlayer': 1, 'episodeStep': 0, 'examples': [],
+                          'mcts': ArrayMCTS(self.game, self.nnet, self.args)}) for _ in range(numGames)]
+        batchSize = max(1, getattr(self.args, 'mctsBatchSize', 1))
+        trainExamples = []
+
+        while games:
+            for g in games:
+                g.episodeStep += 1
+                g.canonicalBoard = self.game.getCanonicalForm(g.board, g.curPlayer)
+                if getattr(self.args, 'reuseTree', False):
+                    g.mcts.reroot(g.canonicalBoard)
+                g.sims = 0
+
+            searching = games
+            while searching:
+                pending = [g.mcts.collectLeaves(g.canonicalBoard, min(batchSize, self.args.numMCTSSims - g.sims))
+                           for g in searching]
+                boards = [leaf.board for leaves, _ in pending for leaf, _ in leaves]
+                if boards:
+                    pis, vs = self.nnet.predict_batch(boards)
+                i = 0
+                for g, (leaves, done) in zip(searching, pending):
+                    if leaves:
+                        # pis and vs are only bound once some game has a leaf to evaluate
+                        g.mcts.expandLeaves(leaves, pis[i:i + len(leaves)], vs[i:i + len(leaves)])
+                        i += len(leaves)
+                    g.sims += len(leaves) + done
+                searching = [g for g in searching if g.sims < self.args.numMCTSSims]
+
+            for g in games:
+                temp = int(g.episodeStep < self.args.tempThreshold)
+                pi = g.mcts.getProbs(g.canonicalBoard, temp=temp)
+                for b, p in self.getExampleSymmetries(g.canonicalBoard, pi):
+                    g.examples.append([b, g.curPlayer, p, None])
+
+                action = np.random.choice(len(pi), p=pi)
+                g.board, g.curPlayer = self.game.getNextState(g.board, g.curPlayer, action)
+                g.result = self.game.getGameEnded(g.board, g.curPlayer)
+                if g.result != 0:
+                    trainExamples += [(x[0], x[2], g.result * ((-1) ** (x[1] != g.curPlayer))) for x in g.examples]
+            games = [g for g in games if g.result == 0]
+
+        return trainExamples
+
+    def getExampleSymmetries(self, canonicalBoard, pi):
+        """
+        Returns:
+            sym: the (board, pi) pairs stored as examples for a move; all the
+                 symmetries from game.getSymmetries, args.numSymmetries of
+                 them drawn at random if set, or just the move itself with
+                 args.lazySymmetries, where the network draws a random
+                 symmetry of each example at training time instead
+        """
+        if getattr(self.args, 'lazySymmetries', False):
+            return [(canonicalBoard, pi)]
+        numSymmetries = getattr(self.args, 'numSymmetries', None)
+        if numSymmetries:
+            return self.game.sampleSymmetries(canonicalBoard, pi, numSymmetries)
+        return self.game.getSymmetries(canonicalBoard, pi)
+
+    def baseNNet(self):
+        """
+        Returns:
+            nnet: the network being trained, without the CachedNNet wrapper
+        """
+        return self.nnet.nnet if isinstance(self.nnet, CachedNNet) else self.nnet
+
+    def nnetClass(self):
+        """
+        Returns:
+            nnetClass: the class of the network being trained, without the
+                       CachedNNet wrapper
+        """
+        return self.baseNNet().__class__
+
+    def episodeSeed(self, iteration, episode):
+        """
+        Returns:
+            seed: the random seed of an episode of self-play, derived from
+                  args.seed (default 0), the iteration and the episode number
+        """
+        return int(np.random.SeedSequence([getattr(self.args, 'seed', 0), iteration, episode]).generate_state(1)[0])
+
+    def selfPlayInWorkers(self, iteration):
+        """
+        Plays args.numEps episodes of self-play in a pool of
+        args.selfPlayWorkers processes. Every worker loads the current
+        network from a checkpoint and plays episodes with its own MCTS; the
+        examples are yielded as soon as an episode is finished.
+
+        Every episode has a fixed seed (see episodeSeed), so the examples do
+        not depend on which worker plays it. If a worker crashes, the pool is
+        restarted and its unfinished episodes are played again, up to
+        args.selfPlayRetries (default 3) times per episode.
+
+        Returns:
+            trainExamples: a generator of the examples of every episode, in the
+                           format of executeEpisode but with pi as an array
+        """
+        filename = 'selfplay.pth.tar'
+        self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=filename)
+        initargs = (self.game, self.nnetClass(), self.args, self.args.checkpoint, filename)
+        retries = getattr(self.args, 'selfPlayRetries', 3)
+
+        todo = list(range(self.args.numEps))
+        failures = {}  # episode -> number of failed attempts
+        progress = tqdm(total=self.args.numEps, desc="Self Play")
+        while todo:
+            with ProcessPoolExecutor(self.args.selfPlayWorkers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=initSelfPlayWorker,
+                                     initargs=initargs) as pool:
+                futures = {pool.submit(selfPlayWorker, self.episodeSeed(iteration, e)): e for e in todo}
+                todo = []
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        episode = futures.pop(future)
+                        try:
+                            boards, pis, vs = future.result()
+                        except BrokenProcessPool as e:
+                            error = e
+                        except Exception as e:
+                            log.exception(f'Self-play episode {episode} failed')
+                            error = e
+                        else:
+                            progress.update()
+                            yield from zip(boards, pis, vs)
+                            continue
+                        failures[episode] = failures.get(episode, 0) + 1
+                        if failures[episode] > retries:
+                            progress.close()
+                            raise RuntimeError(f'Self-play episode {episode} failed {failures[episode]} times') from error
+                        todo.append(episode)
+            if todo:
+                log.warning(f'Restarting the self-play workers to replay {len(todo)} episodes')
+        progress.close()
+
     def learn(self):
         """
         Performs numIters iterations with numEps episodes of self-play in each
@@ -75,7 +346,12 @@ class Coach():
         examples in trainExamples (which has a maximum length of maxlenofQueue).
         It then pits the new neural network against the old one and accepts it
         only if it wins >= updateThreshold fraction of games.
+
+        With args.pipeline the phases run concurrently instead, see
+        learnPipelined.
         """
+        if getattr(self.args, 'pipeline', False):
+            return self.learnPipelined()
 
         for i in range(1, self.args.numIters + 1):
             # bookkeeping
@@ -84,42 +360,68 @@ class Coach():
             if not self.skipFirstSelfPlay or i > 1:
                 iterationTrainExamples = deque([], maxlen=self.args.maxlenOfQueue)
 
-                for _ in tqdm(range(self.args.numEps), desc="Self Play"):
-                    self.mcts = MCTS(self.game, self.nnet, self.args)  # reset search tree
-                    iterationTrainExamples += self.executeEpisode()
+                parallelGames = getattr(self.args, 'parallelGames', 1)
+                if getattr(self.args, 'selfPlayWorkers', 0) > 1:
+                    iterationTrainExamples += self.selfPlayInWorkers(i)
+                elif parallelGames > 1:
+                    for start in tqdm(range(0, self.args.numEps, parallelGames), desc="Self Play"):
+                        iterationTrainExamples += self.executeEpisodes(min(parallelGames, self.args.numEps - start))
+                else:
+                    for _ in tqdm(range(self.args.numEps), desc="Self Play"):
+                        self.mcts = self.mctsClass(self.game, self.nnet, self.args)  # reset search tree
+                        iterationTrainExamples += self.executeEpisode()
 
                 # save the iteration examples to the history 
-                self.trainExamplesHistory.append(iterationTrainExamples)
+                if self.replayBuffer is not None:
+                    self.replayBuffer.addIteration(iterationTrainExamples, self.args.numItersForTrainExamplesHistory)
+                else:
+                    self.trainExamplesHistory.append(iterationTrainExamples)
+                    if getattr(self.args, 'saveExamples', False):
+                        # NB! the examples were collected using the model from the previous iteration, so (i-1)
+                        self.saveTrainExamples(i - 1)
+                self.logCacheStats('Self play', self.nnet)
 
             if len(self.trainExamplesHistory) > self.args.numItersForTrainExamplesHistory:
                 log.warning(
                     f"Removing the oldest entry in trainExamples. len(trainExamplesHistory) = {len(self.trainExamplesHistory)}")
                 self.trainExamplesHistory.pop(0)
-            # backup history to a file
-            # NB! the examples were collected using the model from the previous iteration, so (i-1)  
-            # self.saveTrainExamples(i - 1) Do NOT backup due to memoryerror
 
             # shuffle examples before training
-            trainExamples = []
-            for e in self.trainExamplesHistory:
-                trainExamples.extend(e)
-            shuffle(trainExamples)
+            trainExamples = self.getTrainExamples()
 
             # training new network, keeping a copy of the old one
             self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
             self.pnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
-            pmcts = MCTS(self.game, self.pnet, self.args)
+            pmcts = self.mctsClass(self.game, self.pnet, self.args)
 
             self.nnet.train(trainExamples)
-            nmcts = MCTS(self.game, self.nnet, self.args)
+            nmcts = self.mctsClass(self.game, self.nnet, self.args)
+
+            arenaWorkers = getattr(self.args, 'arenaWorkers', 0)
+            playerFactories = None
+            if arenaWorkers > 1:
+                # the worker processes load both networks from checkpoints
+                self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='arena.pth.tar')
+                playerFactories = (
+                    MCTSPlayerFactory(self.game, self.nnetClass(), self.args, self.args.checkpoint, 'temp.pth.tar'),
+                    MCTSPlayerFactory(self.game, self.nnetClass(), self.args, self.args.checkpoint, 'arena.pth.tar'))
 
             log.info('PITTING AGAINST PREVIOUS VERSION')
             arena = Arena(lambda x: np.argmax(pmcts.getActionProb(x, temp=0)),
-                          lambda x: np.argmax(nmcts.getActionProb(x, temp=0)), self.game)
-            pwins, nwins, draws = arena.playGames(self.args.arenaCompare)
+                          lambda x: np.argmax(nmcts.getActionProb(x, temp=0)), self.game,
+                          playerFactories=playerFactories, workers=arenaWorkers)
+            decision = None
+            if getattr(self.args, 'sprt', False):
+                pwins, nwins, draws, decision = arena.playGamesSPRT(self.args.arenaCompare, makeSPRT(self.args))
+                log.info(f'SPRT {decision or "undecided"} after {pwins + nwins + draws} games, '
+                         f'saved {self.args.arenaCompare - (pwins + nwins + draws)} games')
+            else:
+                pwins, nwins, draws = arena.playGames(self.args.arenaCompare, seed=i)
+            self.logCacheStats('Arena (previous)', self.pnet)
+            self.logCacheStats('Arena (new)', self.nnet)
 
             log.info('NEW/PREV WINS : %d / %d ; DRAWS : %d' % (nwins, pwins, draws))
-            if pwins + nwins == 0 or float(nwins) / (pwins + nwins) < self.args.updateThreshold:
+            if not isAccepted(self.args, pwins, nwins, decision):
                 log.info('REJECTING NEW MODEL')
                 self.nnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
             else:
@@ -127,19 +429,187 @@ class Coach():
                 self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=self.getCheckpointFile(i))
                 self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='best.pth.tar')
 
+    def learnPipelined(self):
+        """
+        Performs numIters training iterations with self-play, training and
+        gating running at the same time. args.selfPlayWorkers processes (at
+        least one) keep playing episodes with the latest accepted network,
+        while this process trains on the replay buffer every time numEps new
+        episodes have arrived. Each new network is saved as a checkpoint and
+        pitted against the accepted one in a separate gating process, one
+        candidate at a time; once accepted, the self-play workers load it for
+        their next episode. The trainer keeps its weights whether or not a
+        candidate is accepted, so no training is lost while gating runs.
+        After the last iteration the pending candidates are still gated.
+
+        After every iteration self.pipelineStats is updated and logged: the
+        self-play throughput, the iteration of the accepted network and the
+        policy lag, i.e. how many iterations older than the trained network
+        the networks were that played the new examples.
+        """
+        folder = self.args.checkpoint
+        workers = max(1, getattr(self.args, 'selfPlayWorkers', 0))
+        nnetClass = self.nnetClass()
+        accepted = 0  # the iteration whose network plays the self-play games
+        acceptedFile = self.getCheckpointFile(accepted)
+        self.nnet.save_checkpoint(folder=folder, filename=acceptedFile)
+        self.pipelineStats = dotdict({'episodes': 0, 'examples': 0, 'episodesPerHour': 0.0, 'iteration': 0,
+                                      'accepted': 0, 'meanPolicyLag': 0.0, 'maxPolicyLag': 0})
+
+        selfPlay = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=initSelfPlayWorker,
+                                       initargs=(self.game, nnetClass, self.args, folder, acceptedFile))
+        gate = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'))
+        futures = {}  # self-play future -> iteration of the network playing it
+        gating = None  # (future, iteration) of the candidate being gated
+        candidate = None  # iteration of the latest network that was not gated yet
+        newExamples = deque([], maxlen=self.args.maxlenOfQueue)
+        lags = []  # iteration of the network of every new episode
+        episode = 0
+        start = time.time()
+        try:
+            while True:
+                # after the last iteration only the gating of the pending candidates is waited for
+                training = self.pipelineStats.iteration < self.args.numIters
+                if not training and gating is None and candidate is None:
+                    break
+                while training and len(futures) < 2 * workers:
+                    future = selfPlay.submit(selfPlayWorker, self.episodeSeed(0, episode), acceptedFile)
+                    futures[future] = accepted
+                    episode += 1
+
+                waiting = (list(futures) if training else []) + ([gating[0]] if gating else [])
+                done, _ = wait(waiting, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if gating is not None and future is gating[0]:
+                        if self.gatingResult(*gating):
+                            accepted = gating[1]
+                            acceptedFile = self.getCheckpointFile(accepted)
+                            self.pipelineStats['accepted'] = accepted
+                        elif isinstance(future.exception(), BrokenProcessPool):
+                            log.warning('The gating process died, restarting it')
+                            gate.shutdown(wait=False)
+                            gate = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'))
+                        gating = None
+                        continue
+
+                    played = futures.pop(future)
+                    try:
+                        boards, pis, vs = future.result()
+                    except BrokenProcessPool:
+                        log.exception(f'A self-play worker died, restarting the pool and dropping '
+                                      f'{len(futures) + 1} episodes in flight')
+                        selfPlay.shutdown(wait=False)
+                        selfPlay = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                                       initializer=initSelfPlayWorker,
+                                                       initargs=(self.game, nnetClass, self.args, folder, acceptedFile))
+                        futures = {}
+                        break
+                    except Exception:
+                        log.exception('Self-play episode failed')
+                        continue
+                    newExamples.extend(zip(boards, pis, vs))
+                    lags.append(played)
+                    self.pipelineStats['episodes'] += 1
+                    self.pipelineStats['examples'] += len(vs)
+
+                if len(lags) >= self.args.numEps:
+                    self.pipelineStats['iteration'] += 1
+                    i = self.pipelineStats.iteration
+                    log.info(f'Starting Iter #{i} ...')
+                    if self.replayBuffer is not None:
+                        self.replayBuffer.addIteration(newExamples, self.args.numItersForTrainExamplesHistory)
+                    else:
+                        self.trainExamplesHistory.append(newExamples)
+                        if len(self.trainExamplesHistory) > self.args.numItersForTrainExamplesHistory:
+                            self.trainExamplesHistory.pop(0)
+                    self.nnet.train(self.getTrainExamples())
+                    self.nnet.save_checkpoint(folder=folder, filename=self.getCheckpointFile(i))
+                    candidate = i
+
+                    lag = [i - 1 - played for played in lags]
+                    self.pipelineStats.update({
+                        'episodesPerHour': self.pipelineStats.episodes / (time.time() - start) * 3600,
+                        'accepted': accepted, 'meanPolicyLag': float(np.mean(lag)), 'maxPolicyLag': max(lag)})
+                    log.info('Pipeline: ' + ', '.join(f'{k} {v:.4g}' if isinstance(v, float) else f'{k} {v}'
+                                                      for k, v in self.pipelineStats.items()))
+                    newExamples = deque([], maxlen=self.args.maxlenOfQueue)
+                    lags = []
+
+                if gating is None and candidate is not None:
+                    gating = (gate.submit(gateCandidate, self.game, nnetClass, self.args, acceptedFile,
+                                          self.getCheckpointFile(candidate)), candidate)
+                    candidate = None
+        finally:
+            selfPlay.shutdown(wait=False, cancel_futures=True)
+            gate.shutdown()
+
+    def getTrainExamples(self):
+        """
+        Returns:
+            trainExamples: the replay buffer itself, which the train paths
+                           read batches from, or the shuffled examples of
+                           trainExamplesHistory if there is none
+        """
+        if self.replayBuffer is not None:
+            return self.replayBuffer
+        trainExamples = []
+        for e in self.trainExamplesHistory:
+            trainExamples.extend(e)
+        shuffle(trainExamples)
+        return trainExamples
+
+    def gatingResult(self, future, iteration):
+        """
+        Waits for the gating of the network of iteration and logs its result.
+        A gating that failed counts as a rejection.
+
+        Returns:
+            accepted: whether the network was accepted
+        """
+        try:
+            pwins, nwins, draws, accepted = future.result()
+        except Exception:
+            log.exception(f'Gating iteration {iteration} failed, REJECTING NEW MODEL')
+            return False
+        log.info(f'Gating iteration {iteration}: NEW/PREV WINS : {nwins} / {pwins} ; DRAWS : {draws}, '
+                 f'{"ACCEPTING" if accepted else "REJECTING"} NEW MODEL')
+        return accepted
+
+    def logCacheStats(self, phase, nnet):
+        if isinstance(nnet, CachedNNet):
+            log.info(f'{phase} eval cache hit rate: {nnet.hitRate():.1%} ({nnet.hits} hits, {nnet.misses} misses)')
+            nnet.resetStats()
+
     def getCheckpointFile(self, iteration):
         return 'checkpoint_' + str(iteration) + '.pth.tar'
 
     def saveTrainExamples(self, iteration):
-        folder = self.args.checkpoint
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-        filename = os.path.join(folder, self.getCheckpointFile(iteration) + ".examples")
-        with open(filename, "wb+") as f:
-            Pickler(f).dump(self.trainExamplesHistory)
-        f.closed
+        """
+        Writes the examples of the latest self-play iteration as the shard of
+        iteration in the ExampleStore in checkpoint/examples/, so only one
+        iteration is serialized at a time.
+        """
+        store = ExampleStore(os.path.join(self.args.checkpoint, 'examples'))
+        size = store.save(iteration, self.trainExamplesHistory[-1])
+        log.info(f'Saved {len(self.trainExamplesHistory[-1])} examples of iteration {iteration} ({size} bytes)')
 
     def loadTrainExamples(self):
+        """
+        Loads the numItersForTrainExamplesHistory latest iterations of the
+        ExampleStore next to the loaded model. Pickled .examples files from
+        before the ExampleStore are still read, see ExampleStore.py to
+        convert them.
+        """
+        store = ExampleStore(os.path.join(self.args.load_folder_file[0], 'examples'))
+        iterations = store.iterations()[-self.args.numItersForTrainExamplesHistory:]
+        if iterations:
+            log.info(f'Loading the examples of iterations {iterations[0]}-{iterations[-1]}...')
+            self.trainExamplesHistory = list(store.loadHistory(iterations))
+            log.info('Loading done!')
+            self.skipFirstSelfPlay = True
+            return
+
         modelFile = os.path.join(self.args.load_folder_file[0], self.args.load_folder_file[1])
         examplesFile = modelFile + ".examples"
         if not os.path.isfile(examplesFile):
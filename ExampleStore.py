@@ -0,0 +1,149 @@
+import argparse
+import logging
+import os
+import re
+import sys
+from collections import deque
+from pickle import Unpickler
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class ExampleStore():
+    """
+    On-disk store of training examples with one compressed .npz shard per
+    self-play iteration, written and read one iteration at a time instead of
+    pickling the whole trainExamplesHistory.
+
+    Boards are stored as int8 when all their values are small integers (the
+    original dtype is restored on load). Policies are stored as float16,
+    sparse (the indices and values of their non-zero entries) when fewer than
+    half of the entries are non-zero, which is the usual case since only
+    valid moves get visits.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def shardFile(self, iteration):
+        return os.path.join(self.folder, f'iteration_{iteration:05d}.npz')
+
+    def iterations(self):
+        """
+        Returns:
+            iterations: the sorted numbers of the iterations in the store
+        """
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(int(m.group(1)) for m in map(re.compile(r'iteration_(\d+)\.npz$').match, os.listdir(self.folder))
+                      if m)
+
+    def save(self, iteration, examples):
+        """
+        Writes the examples of iteration, (board, pi, v) tuples, to its shard.
+
+        Returns:
+            bytes: the size of the shard on disk
+        """
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        boards, pis, vs = zip(*examples)
+        boards = np.asarray(boards)
+        pis = np.asarray(pis, dtype=np.float32)
+        arrays = {'boardDtype': np.array(boards.dtype.str), 'vs': np.asarray(vs, dtype=np.float32)}
+
+        small = np.array_equal(boards, np.round(boards)) and boards.min() >= -128 and boards.max() <= 127
+        arrays['boards'] = boards.astype(np.int8) if small else boards
+
+        rows, cols = np.nonzero(pis)
+        if len(rows) < pis.size / 2:
+            arrays['piShape'] = np.array(pis.shape)
+            arrays['piRows'] = rows.astype(np.int32)
+            arrays['piCols'] = cols.astype(np.int32 if pis.shape[1] > 2 ** 15 else np.int16)
+            arrays['piValues'] = pis[rows, cols].astype(np.float16)
+        else:
+            arrays['pis'] = pis.astype(np.float16)
+
+        filename = self.shardFile(iteration)
+        # write to a temporary file first so a crash never leaves a truncated shard
+        with open(filename + '.tmp', 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(filename + '.tmp', filename)
+        return os.path.getsize(filename)
+
+    def load(self, iteration):
+        """
+        Returns:
+            examples: a list of the (board, pi, v) tuples of iteration
+        """
+        with np.load(self.shardFile(iteration)) as shard:
+            boards = shard['boards'].astype(np.dtype(str(shard['boardDtype'])))
+            if 'pis' in shard:
+                pis = shard['pis'].astype(np.float32)
+            else:
+                pis = np.zeros(tuple(shard['piShape']), dtype=np.float32)
+                pis[shard['piRows'], shard['piCols']] = shard['piValues']
+            vs = shard['vs']
+        return list(zip(boards, pis, vs))
+
+    def loadHistory(self, iterations=None):
+        """
+        Lazily reads the given iterations (all of them by default), one shard
+        at a time.
+
+        Returns:
+            history: a generator of one deque of examples per iteration, like
+                     the entries of Coach.trainExamplesHistory
+        """
+        for iteration in (self.iterations() if iterations is None else iterations):
+            yield deque(self.load(iteration))
+
+    def nbytes(self):
+        return sum(os.path.getsize(self.shardFile(i)) for i in self.iterations())
+
+
+def convert(examplesFile, folder, firstIteration=None):
+    """
+    Converts a pickled trainExamplesHistory (Coach.saveTrainExamples before
+    the ExampleStore) into shards in folder. The iterations are numbered so
+    that the last one is the iteration in the checkpoint_<i> file name, or
+    from firstIteration (default 0) if given or if the name has no number.
+
+    Returns:
+        examples: the number of examples converted
+        before: the size of the pickle file in bytes
+        after: the size of the written shards in bytes
+    """
+    with open(examplesFile, 'rb') as f:
+        history = Unpickler(f).load()
+    if firstIteration is None:
+        match = re.search(r'checkpoint_(\d+)', os.path.basename(examplesFile))
+        firstIteration = int(match.group(1)) - len(history) + 1 if match else 0
+
+    store = ExampleStore(folder)
+    examples = after = 0
+    for i, iterationExamples in enumerate(history):
+        if len(iterationExamples):
+            after += store.save(firstIteration + i, iterationExamples)
+            examples += len(iterationExamples)
+    return examples, os.path.getsize(examplesFile), after
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converts a pickled .examples file into an ExampleStore folder.')
+    parser.add_argument('examplesFile')
+    parser.add_argument('folder')
+    parser.add_argument('--first-iteration', type=int, default=None)
+    opts = parser.parse_args()
+
+    examples, before, after = convert(opts.examplesFile, opts.folder, opts.first_iteration)
+    if not examples:
+        sys.exit('No examples found')
+    print(f'{examples} examples: {before / examples:.1f} bytes per example before, '
+          f'{after / examples:.1f} after ({before / max(after, 1):.1f}x smaller)')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Game():
     """
     This class specifies the base Game class. To define your own game, subclass
@@ -101,6 +104,24 @@ class Game():
         """
         pass
 
+    def sampleSymmetries(self, board, pi, k):
+        """
+        Input:
+            board: current board
+            pi: policy vector of size self.getActionSize()
+            k: number of symmetrical forms wanted
+
+        Returns:
+            symmForms: k of the symmetrical forms of getSymmetries drawn at
+                       random without replacement, or all of them if there
+                       are not more than k. Override it when a subset can be
+                       made without building all the forms.
+        """
+        symmForms = self.getSymmetries(board, pi)
+        if k < len(symmForms):
+            symmForms = [symmForms[i] for i in sorted(np.random.choice(len(symmForms), k, replace=False))]
+        return symmForms
+
     def stringRepresentation(self, board):
         """
         Input:
@@ -111,3 +132,23 @@ class Game():
                          Required by MCTS for hashing.
         """
         pass
+
+    def hashKey(self, board):
+        """
+        Input:
+            board: current board
+
+        Returns:
+            key: a hashable key of the board, used by MCTS instead of
+                 stringRepresentation. Optional: games can override this with
+                 a cheaper key, e.g. a Zobrist hash (see utils.ZobristKeys).
+
+        A game whose keys can be updated incrementally can also define
+            getNextHashKey(key, board, player, action): the key of
+                getNextState(board, player, action)[0] given the key of board
+            getCanonicalHashKey(key, player): the key of
+                getCanonicalForm(board, player) given the key of board
+        MCTS then derives child keys from the parent key instead of hashing
+        every board it visits.
+        """
+        return self.stringRepresentation(board)
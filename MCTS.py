@@ -1,13 +1,49 @@
 import logging
-import math
+import time
 
 import numpy as np
 
+from utils import dotdict
+
 EPS = 1e-8
 
 log = logging.getLogger(__name__)
 
 
+def puctAction(Q, N, P, Ns, valids, cpuct):
+    """
+    Returns the valid action with the highest upper confidence bound, given
+    the per-action arrays Q, N and P of a state visited Ns times. The bound is
+    computed for all actions at once; ties are broken towards the lowest
+    action index.
+    """
+    u = np.where(N > 0,
+                 Q + cpuct * P * np.sqrt(Ns) / (1 + N),
+                 cpuct * P * np.sqrt(Ns + EPS))  # Q = 0 ?
+    u[valids == 0] = -np.inf
+    return int(np.argmax(u))
+
+
+def maskedPolicy(P, valids):
+    """
+    Returns the policy P predicted by the network with the invalid moves
+    masked out and renormalized, as float64.
+    """
+    P = P * valids  # masking invalid moves
+    sum_P = np.sum(P)
+    if sum_P > 0:
+        P /= sum_P  # renormalize
+    else:
+        # if all valid moves were masked make all valid moves equally probable
+
+        # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
+        # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.
+        log.error("All valid moves were masked, doing a workaround.")
+        P = P + valids
+        P /= np.sum(P)
+    return P.astype(np.float64)
+
+
 class MCTS():
     """
     This class handles the MCTS tree.
@@ -17,28 +53,127 @@ class MCTS():
         self.game = game
         self.nnet = nnet
         self.args = args
-        self.Qsa = {}  # stores Q values for s,a (as defined in the paper)
-        self.Nsa = {}  # stores #times edge s,a was visited
+        # state keys: game.hashKey if the game provides one, else its string representation
+        self.hashKey = getattr(game, 'hashKey', None) or game.stringRepresentation
+        self.incrementalKeys = hasattr(game, 'getNextHashKey') and hasattr(game, 'getCanonicalHashKey')
+        self.symmetric = getattr(args, 'symmetricSearch', False)
+        self.Ss = {}  # stores (key, board) of the representative of board s under game.getSymmetries
+
+        self.Qsa = {}  # stores Q values for s,a (as defined in the paper), as Qsa[s][a]
+        self.Nsa = {}  # stores #times edge s,a was visited, as Nsa[s][a]
         self.Ns = {}  # stores #times board s was visited
         self.Ps = {}  # stores initial policy (returned by neural net)
 
         self.Es = {}  # stores game.getGameEnded ended for board s
         self.Vs = {}  # stores game.getValidMoves for board s
 
-    def getActionProb(self, canonicalBoard, temp=1):
+        self.searchStats = dotdict({'simulations': 0, 'skipped': 0, 'seconds': 0.0, 'timedOut': False})  # of the last getActionProb
+
+    def getActionProb(self, canonicalBoard, temp=1, timeBudget=None):
         """
         This function performs numMCTSSims simulations of MCTS starting from
         canonicalBoard.
 
+        If timeBudget (or args.mctsTimeBudget) is given in seconds, the search
+        also stops at that wall-clock deadline and the counts gathered so far
+        are used. At least two simulations are always run so that the root has
+        visit counts.
+
+        With args.reuseTree the tree is first re-rooted at canonicalBoard, see
+        reroot.
+
+        With temp=0 and args.earlyStop, the search also stops once the most
+        visited root action leads the runner-up by more than the simulations
+        left, so the remaining ones cannot change the chosen move.
+        args.earlyStopMargin (default 0) lets it stop that many visits
+        earlier, trading exactness for latency.
+
+        self.searchStats records the simulations done, the ones skipped by the
+        early stop, the seconds spent and whether the deadline cut the search
+        short.
+
         Returns:
             probs: a policy vector where the probability of the ith action is
                    proportional to Nsa[(s,a)]**(1./temp)
         """
-        for i in range(self.args.numMCTSSims):
-            self.search(canonicalBoard)
+        if getattr(self.args, 'reuseTree', False):
+            self.reroot(canonicalBoard)
+        if timeBudget is None:
+            timeBudget = getattr(self.args, 'mctsTimeBudget', None)
+        start = time.time()
+        deadline = start + timeBudget if timeBudget else None
+
+        earlyStop = temp == 0 and getattr(self.args, 'earlyStop', False)
+        margin = getattr(self.args, 'earlyStopMargin', 0)
+        s = self.rootKey(canonicalBoard)
+
+        i = 0
+        skipped = 0
+        timedOut = False
+        nextCheck = 0  # the early stop cannot trigger before this many simulations
+        while i < self.args.numMCTSSims:
+            if deadline is not None and i >= 2 and time.time() >= deadline:
+                timedOut = True
+                break
+            i += self.simulate(canonicalBoard, self.args.numMCTSSims - i)
+            if earlyStop and nextCheck <= i < self.args.numMCTSSims:
+                counts = self.edgeCounts(s)
+                if counts is not None:
+                    second, best = np.partition(counts, -2)[-2:]
+                    gap = self.args.numMCTSSims - i - margin - (best - second)
+                    if gap < 0:
+                        skipped = self.args.numMCTSSims - i
+                        break
+                    # every simulation grows the lead by at most one and uses one up
+                    nextCheck = i + gap // 2 + 1
+        self.searchStats = dotdict({'simulations': i, 'skipped': skipped, 'seconds': time.time() - start,
+                                    'timedOut': timedOut})
 
-        s = self.game.stringRepresentation(canonicalBoard)
-        counts = [self.Nsa[(s, a)] if (s, a) in self.Nsa else 0 for a in range(self.game.getActionSize())]
+        return self.getProbs(canonicalBoard, temp)
+
+    def reroot(self, canonicalBoard):
+        """
+        Frees the statistics of every state that can no longer be reached from
+        canonicalBoard through visited edges, keeping the ones below it. The
+        children of a state are not stored, so they are found again with
+        getNextState along every edge with Nsa > 0.
+
+        Returns:
+            freed: the number of states that were removed
+        """
+        s = self.hashKey(canonicalBoard)
+        if self.symmetric:
+            s, canonicalBoard = self.representative(canonicalBoard, s)
+        reachable = {s}
+        stack = [(s, canonicalBoard)]
+        while stack:
+            s, board = stack.pop()
+            if s not in self.Nsa:
+                continue
+            for a in np.flatnonzero(self.Nsa[s]):
+                next_s, next_player = self.game.getNextState(board, 1, a)
+                next_s = self.game.getCanonicalForm(next_s, next_player)
+                child = self.childKey(s, board, a, next_player, next_s)
+                if self.symmetric:
+                    child, next_s = self.representative(next_s, child)
+                if child not in reachable:
+                    reachable.add(child)
+                    stack.append((child, next_s))
+
+        freed = len(self.Es) - len(reachable.intersection(self.Es))
+        for table in ('Qsa', 'Nsa', 'Ns', 'Ps', 'Es', 'Vs'):
+            setattr(self, table, {s: v for s, v in getattr(self, table).items() if s in reachable})
+        self.Ss = {s: rep for s, rep in self.Ss.items() if rep[0] in reachable}
+        log.debug(f'Re-rooted search tree, kept {len(self.Es)} states and freed {freed}')
+        return freed
+
+    def getProbs(self, canonicalBoard, temp=1):
+        """
+        Returns:
+            probs: the policy vector of getActionProb for the visit counts
+                   gathered so far from canonicalBoard
+        """
+        counts = self.getCounts(canonicalBoard)
 
         if temp == 0:
             bestAs = np.array(np.argwhere(counts == np.max(counts))).flatten()
@@ -52,9 +187,86 @@ class MCTS():
         probs = [x / counts_sum for x in counts]
         return probs
 
+    def simulate(self, canonicalBoard, remaining):
+        """
+        Runs at most remaining simulations from canonicalBoard.
+
+        Returns:
+            n: the number of simulations that were run
+        """
+        self.search(canonicalBoard)
+        return 1
+
+    def getCounts(self, canonicalBoard):
+        """
+        Returns:
+            counts: a list with the visit count Nsa[(s,a)] of every action from
+                    canonicalBoard (0 for actions that were never taken)
+        """
+        s = self.rootKey(canonicalBoard)
+        counts = self.edgeCounts(s)
+        if counts is None:
+            return [0] * self.game.getActionSize()
+        return self.unpermute(canonicalBoard, s, counts) if self.symmetric else counts.tolist()
+
+    def rootKey(self, canonicalBoard):
+        """
+        Returns:
+            s: the key under which the statistics of canonicalBoard are stored
+        """
+        s = self.hashKey(canonicalBoard)
+        if self.symmetric:
+            s, _ = self.representative(canonicalBoard, s)
+        return s
+
+    def edgeCounts(self, s):
+        """
+        Returns:
+            counts: the array of visit counts Nsa[s], None if s is not expanded
+        """
+        return self.Nsa.get(s)
+
+    def representative(self, canonicalBoard, s):
+        """
+        Maps canonicalBoard (with key s) to the one board of its symmetry class
+        that the search works on: the symmetric form from game.getSymmetries
+        with the smallest key. Symmetric positions then share their tree
+        statistics and neural network evaluation.
+
+        Returns:
+            key: the key of the representative board
+            board: the representative board
+        """
+        if s not in self.Ss:
+            rep = None
+            for board, _ in self.game.getSymmetries(canonicalBoard, np.arange(self.game.getActionSize())):
+                key = self.hashKey(board)
+                if rep is None or key < rep[0]:
+                    rep = (key, np.ascontiguousarray(board))
+            self.Ss[s] = rep
+        return self.Ss[s]
+
+    def unpermute(self, canonicalBoard, repKey, values):
+        """
+        Maps per-action values of the representative board with key repKey back
+        to the actions of canonicalBoard.
+        """
+        for board, perm in self.game.getSymmetries(canonicalBoard, np.arange(self.game.getActionSize())):
+            if self.hashKey(board) == repKey:
+                result = np.zeros_like(values)
+                result[np.asarray(perm)] = values
+                return result.tolist()
+
+    def selectAction(self, s):
+        """
+        Returns the valid action from board s with the highest upper confidence
+        bound, see puctAction.
+        """
+        return puctAction(self.Qsa[s], self.Nsa[s], self.Ps[s], self.Ns[s], self.Vs[s], self.args.cpuct)
+
     def search(self, canonicalBoard):
         """
-        This function performs one iteration of MCTS. It is recursively called
+        This function performs one iteration of MCTS. The tree is descended
         till a leaf node is found. The action chosen at each node is one that
         has the maximum upper confidence bound as in the paper.
 
@@ -64,15 +276,73 @@ class MCTS():
         outcome is propagated up the search path. The values of Ns, Nsa, Qsa are
         updated.
 
+        The descent keeps the visited (s, a) pairs on an explicit path list
+        instead of recursing once per ply, so long games do not pay Python
+        frame overhead or run into the recursion limit. It visits exactly the
+        same nodes as searchRecursive.
+
         NOTE: the return values are the negative of the value of the current
         state. This is done since v is in [-1,1] and if v is the value of a
         state for the current player, then its value is -v for the other player.
 
+        Returns:
+            v: the negative of the value of the current canonicalBoard
+        """
+        path = []
+        s = self.hashKey(canonicalBoard)
+        if self.symmetric:
+            s, canonicalBoard = self.representative(canonicalBoard, s)
+        while True:
+            if s not in self.Es:
+                self.Es[s] = self.game.getGameEnded(canonicalBoard, 1)
+            if self.Es[s] != 0:
+                # terminal node
+                v = -self.Es[s]
+                break
+
+            if s not in self.Ps:
+                # leaf node
+                v = -self.expand(canonicalBoard, s)
+                break
+
+            # pick the action with the highest upper confidence bound
+            a = self.selectAction(s)
+            path.append((s, a))
+            next_s, next_player = self.game.getNextState(canonicalBoard, 1, a)
+            next_s = self.game.getCanonicalForm(next_s, next_player)
+            s = self.childKey(s, canonicalBoard, a, next_player, next_s)
+            canonicalBoard = next_s
+            if self.symmetric:
+                s, canonicalBoard = self.representative(canonicalBoard, s)
+
+        for s, a in reversed(path):
+            self.Qsa[s][a] = (self.Nsa[s][a] * self.Qsa[s][a] + v) / (self.Nsa[s][a] + 1)
+            self.Nsa[s][a] += 1
+            self.Ns[s] += 1
+            v = -v
+        return v
+
+    def childKey(self, s, canonicalBoard, a, next_player, next_s):
+        """
+        Returns:
+            key: the key of next_s, the canonical board reached by taking
+                 action a from canonicalBoard (whose key is s). It is derived
+                 from s when the game supports incremental keys.
+        """
+        if self.incrementalKeys:
+            return self.game.getCanonicalHashKey(self.game.getNextHashKey(s, canonicalBoard, 1, a), next_player)
+        return self.hashKey(next_s)
+
+    def searchRecursive(self, canonicalBoard):
+        """
+        Recursive formulation of search, calling itself once per ply. Kept as
+        the reference implementation that search is checked against.
+
         Returns:
             v: the negative of the value of the current canonicalBoard
         """
 
-        s = self.game.stringRepresentation(canonicalBoard)
+        s = self.hashKey(canonicalBoard)
 
         if s not in self.Es:
             self.Es[s] = self.game.getGameEnded(canonicalBoard, 1)
@@ -82,55 +352,33 @@ class MCTS():
 
         if s not in self.Ps:
             # leaf node
-            self.Ps[s], v = self.nnet.predict(canonicalBoard)
-            valids = self.game.getValidMoves(canonicalBoard, 1)
-            self.Ps[s] = self.Ps[s] * valids  # masking invalid moves
-            sum_Ps_s = np.sum(self.Ps[s])
-            if sum_Ps_s > 0:
-                self.Ps[s] /= sum_Ps_s  # renormalize
-            else:
-                # if all valid moves were masked make all valid moves equally probable
-
-                # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
-                # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.   
-                log.error("All valid moves were masked, doing a workaround.")
-                self.Ps[s] = self.Ps[s] + valids
-                self.Ps[s] /= np.sum(self.Ps[s])
-
-            self.Vs[s] = valids
-            self.Ns[s] = 0
-            return -v
-
-        valids = self.Vs[s]
-        cur_best = -float('inf')
-        best_act = -1
+            return -self.expand(canonicalBoard, s)
 
         # pick the action with the highest upper confidence bound
-        for a in range(self.game.getActionSize()):
-            if valids[a]:
-                if (s, a) in self.Qsa:
-                    u = self.Qsa[(s, a)] + self.args.cpuct * self.Ps[s][a] * math.sqrt(self.Ns[s]) / (
-                            1 + self.Nsa[(s, a)])
-                else:
-                    u = self.args.cpuct * self.Ps[s][a] * math.sqrt(self.Ns[s] + EPS)  # Q = 0 ?
-
-                if u > cur_best:
-                    cur_best = u
-                    best_act = a
-
-        a = best_act
+        a = self.selectAction(s)
         next_s, next_player = self.game.getNextState(canonicalBoard, 1, a)
         next_s = self.game.getCanonicalForm(next_s, next_player)
 
-        v = self.search(next_s)
-
-        if (s, a) in self.Qsa:
-            self.Qsa[(s, a)] = (self.Nsa[(s, a)] * self.Qsa[(s, a)] + v) / (self.Nsa[(s, a)] + 1)
-            self.Nsa[(s, a)] += 1
-
-        else:
-            self.Qsa[(s, a)] = v
-            self.Nsa[(s, a)] = 1
+        v = self.searchRecursive(next_s)
 
+        self.Qsa[s][a] = (self.Nsa[s][a] * self.Qsa[s][a] + v) / (self.Nsa[s][a] + 1)
+        self.Nsa[s][a] += 1
         self.Ns[s] += 1
         return -v
+
+    def expand(self, canonicalBoard, s):
+        """
+        Evaluates the leaf canonicalBoard (with string representation s) with
+        the neural network and stores its initial policy and valid moves.
+
+        Returns:
+            v: the value of canonicalBoard predicted by the neural network
+        """
+        P, v = self.nnet.predict(canonicalBoard)
+        valids = self.game.getValidMoves(canonicalBoard, 1)
+        self.Ps[s] = maskedPolicy(P, valids)
+        self.Vs[s] = valids
+        self.Ns[s] = 0
+        self.Qsa[s] = np.zeros(len(valids), dtype=np.float64)
+        self.Nsa[s] = np.zeros(len(valids), dtype=np.int64)
+        return v
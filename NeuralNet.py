@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class NeuralNet():
     """
     This class specifies the base NeuralNet class. To define your own neural
@@ -8,6 +11,8 @@ class NeuralNet():
     See othello/NNet.py for an example implementation.
     """
 
+    symmetryGame = None  # a Game to train on random symmetries of the examples with, see augmentBatch
+
     def __init__(self, game):
         pass
 
@@ -36,6 +41,81 @@ class NeuralNet():
         """
         pass
 
+    def predict_batch(self, boards):
+        """
+        Input:
+            boards: a list of boards, each in its canonical form.
+
+        Returns:
+            pis: an array of policy vectors, one row per board
+            vs: an array with the value of each board
+
+        The default runs predict on every board. Override it to evaluate all
+        boards in a single call to the network.
+        """
+        pis, vs = zip(*[self.predict(board) for board in boards])
+        return np.array(pis), np.array(vs).reshape(-1)
+
+    def augmentBatch(self, boards, pis):
+        """
+        Input:
+            boards, pis: the boards and policy vectors of a batch of examples
+
+        Returns:
+            boards, pis: one of the symmetries returned by
+                         symmetryGame.getSymmetries, drawn at random, of every
+                         example, or the input if symmetryGame is None
+
+        Called on every batch of the train paths, so the examples can be
+        stored once instead of once per symmetry. When the symmetries only
+        move cells around (see symmetryPermutations) the whole batch is
+        permuted with one fancy-indexing operation.
+        """
+        if self.symmetryGame is None:
+            return boards, pis
+        perms = self.symmetryPermutations(boards[0], pis[0])
+        if perms is not None:
+            boardPerms, piPerms = perms
+            boards, pis = np.asarray(boards), np.asarray(pis)
+            k = np.random.randint(len(boardPerms), size=len(boards))
+            rows = np.arange(len(boards))[:, None]
+            boards = boards.reshape(len(boards), -1)[rows, boardPerms[k]].reshape(boards.shape)
+            return boards, pis[rows, piPerms[k]]
+
+        augmented = []
+        for board, pi in zip(boards, pis):
+            symmetries = self.symmetryGame.getSymmetries(board, pi)
+            augmented.append(symmetries[np.random.randint(len(symmetries))])
+        boards, pis = zip(*augmented)
+        return list(boards), list(pis)
+
+    def symmetryPermutations(self, board, pi):
+        """
+        Finds out where every symmetry of symmetryGame.getSymmetries moves the
+        cells of a board like board and the entries of a policy like pi, by
+        applying it to a board and a policy holding their own indices.
+
+        Returns:
+            boardPerms, piPerms: arrays with one row per symmetry, giving for
+                                 every cell (entry) of the symmetric board
+                                 (policy) the cell (entry) it comes from, or
+                                 None if the symmetries are not permutations
+        """
+        shape = (np.shape(board), len(pi))
+        cache = self.__dict__.setdefault('_symmetryPermutations', {})
+        if shape not in cache:
+            size = int(np.prod(shape[0]))
+            try:
+                symmetries = self.symmetryGame.getSymmetries(np.arange(size).reshape(shape[0]), np.arange(shape[1]))
+                boardPerms = np.array([np.asarray(b).ravel() for b, _ in symmetries])
+                piPerms = np.array([np.asarray(p).ravel() for _, p in symmetries])
+                valid = (np.array_equal(np.sort(boardPerms, axis=1), np.tile(np.arange(size), (len(symmetries), 1)))
+                         and np.array_equal(np.sort(piPerms, axis=1), np.tile(np.arange(shape[1]), (len(symmetries), 1))))
+            except Exception:
+                valid = False
+            cache[shape] = (boardPerms.astype(np.intp), piPerms.astype(np.intp)) if valid else None
+        return cache[shape]
+
     def save_checkpoint(self, folder, filename):
         """
         Saves the current neural network (with its parameters) in
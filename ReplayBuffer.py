@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class ReplayBuffer():
+    """
+    Fixed-capacity ring buffer of (board, pi, v) training examples, stored in
+    preallocated memory-mapped .npy files in folder instead of Python tuples.
+
+    The arrays are allocated on the first example added, with the shape and
+    dtype of its board and the length of its pi. Adding an example and
+    sampling a batch are O(1) per example; once the buffer is full the oldest
+    examples are overwritten. Examples are grouped by self-play iteration so that whole
+    iterations can be evicted, like numItersForTrainExamplesHistory does for
+    trainExamplesHistory.
+
+    The position of the ring and the iteration sizes are kept in meta.json,
+    written by flush, so a buffer created again on the same folder picks up
+    where the last one stopped.
+    """
+
+    def __init__(self, folder, capacity):
+        self.folder = folder
+        self.capacity = capacity
+        self.head = 0  # slot of the next example
+        self.size = 0  # number of examples held
+        self.iterations = []  # number of examples of every iteration held, oldest first
+        self.boards = self.pis = self.vs = None
+
+        meta = os.path.join(folder, 'meta.json')
+        if os.path.isfile(meta):
+            with open(meta) as f:
+                state = json.load(f)
+            if state['capacity'] != capacity:
+                raise ValueError(f'Replay buffer in {folder} has capacity {state["capacity"]}, not {capacity}')
+            self.head, self.size, self.iterations = state['head'], state['size'], state['iterations']
+            self.boards = np.load(os.path.join(folder, 'boards.npy'), mmap_mode='r+')
+            self.pis = np.load(os.path.join(folder, 'pis.npy'), mmap_mode='r+')
+            self.vs = np.load(os.path.join(folder, 'vs.npy'), mmap_mode='r+')
+            log.info(f'Loaded {self.size} examples of {len(self.iterations)} iterations from {folder}')
+
+    def __len__(self):
+        return self.size
+
+    def allocate(self, board, pi):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        board = np.asarray(board)
+        self.boards = np.lib.format.open_memmap(os.path.join(self.folder, 'boards.npy'), mode='w+',
+                                                dtype=board.dtype, shape=(self.capacity,) + board.shape)
+        self.pis = np.lib.format.open_memmap(os.path.join(self.folder, 'pis.npy'), mode='w+',
+                                             dtype=np.float32, shape=(self.capacity, len(pi)))
+        self.vs = np.lib.format.open_memmap(os.path.join(self.folder, 'vs.npy'), mode='w+',
+                                            dtype=np.float32, shape=(self.capacity,))
+
+    def evict(self, count):
+        """
+        Forgets the count oldest examples, skipping the empty iterations in
+        front of them.
+        """
+        self.size -= count
+        while count:
+            if self.iterations[0] == 0:
+                self.iterations.pop(0)
+                continue
+            evicted = min(count, self.iterations[0])
+            self.iterations[0] -= evicted
+            count -= evicted
+            if self.iterations[0] == 0:
+                self.iterations.pop(0)
+
+    def addIteration(self, examples, maxIterations=None):
+        """
+        Appends the examples of a new self-play iteration, overwriting the
+        oldest examples if the buffer is full, then evicts the oldest
+        iterations until at most maxIterations are left and writes the buffer
+        to disk.
+
+        The examples to be overwritten are evicted and written down in
+        meta.json before their slots are reused, so a crash while the
+        iteration is written leaves the buffer as it was minus those examples.
+        """
+        examples = list(examples)[-self.capacity:]
+        if examples and self.boards is None:
+            self.allocate(examples[0][0], examples[0][1])
+        overwritten = max(0, self.size + len(examples) - self.capacity)
+        if overwritten:
+            self.evict(overwritten)
+            self.flush()
+        for i, (board, pi, v) in enumerate(examples):
+            slot = (self.head + i) % self.capacity
+            self.boards[slot] = board
+            self.pis[slot] = pi
+            self.vs[slot] = v
+        self.head = (self.head + len(examples)) % self.capacity
+        self.size += len(examples)
+        self.iterations.append(len(examples))
+        if maxIterations is not None:
+            while len(self.iterations) > maxIterations:
+                log.warning(f'Removing the oldest iteration from the replay buffer, {len(self.iterations)} iterations')
+                self.size -= self.iterations.pop(0)
+        self.flush()
+
+    def indices(self):
+        """
+        Returns:
+            indices: the slots of the examples held, oldest first
+        """
+        return (self.head - self.size + np.arange(self.size)) % self.capacity
+
+    def __getitem__(self, i):
+        """
+        Returns:
+            example: the (board, pi, v) tuple of the ith oldest example
+        """
+        if not -self.size <= i < self.size:
+            raise IndexError(i)
+        slot = (self.head - self.size + i % self.size) % self.capacity
+        return self.boards[slot], self.pis[slot], self.vs[slot]
+
+    def gather(self, ids):
+        """
+        Returns:
+            boards, pis, vs: arrays with the examples at the given positions,
+                             oldest first as in __getitem__
+        """
+        slots = (self.head - self.size + np.asarray(ids)) % self.capacity
+        return self.boards[slots], self.pis[slots], self.vs[slots]
+
+    def sample(self, batchSize, rng=np.random):
+        """
+        Returns:
+            boards, pis, vs: arrays with batchSize examples drawn uniformly with
+                             replacement
+        """
+        return self.gather(rng.randint(self.size, size=batchSize))
+
+    def examples(self, shuffle=True):
+        """
+        Returns:
+            trainExamples: a list of all the examples held, as (board, pi, v)
+                           tuples like the ones of Coach.executeEpisode, in
+                           random order if shuffle
+        """
+        idx = self.indices()
+        if shuffle:
+            np.random.shuffle(idx)
+        return list(zip(self.boards[idx], self.pis[idx], self.vs[idx]))
+
+    def flush(self):
+        """
+        Writes the arrays and the ring position to disk.
+        """
+        if self.boards is None:
+            return
+        for array in (self.boards, self.pis, self.vs):
+            array.flush()
+        meta = os.path.join(self.folder, 'meta.json')
+        with open(meta + '.tmp', 'w') as f:
+            json.dump({'capacity': self.capacity, 'head': self.head, 'size': self.size,
+                       'iterations': self.iterations}, f)
+        os.replace(meta + '.tmp', meta)
@@ -0,0 +1,66 @@
+"""
+Benchmark of the BatchStream the Keras wrappers train from, against the
+dense arrays they used to build from the whole example list before
+model.fit.
+
+Fills a ReplayBuffer with synthetic 11x11 Connect4-sized examples and reports,
+for one epoch of batches, the peak memory allocated on top of the examples
+(tracemalloc) and the time, both for the dense conversion of a list of
+examples and for streaming from the list and from the buffer.
+Use `python benchmarks/batch_stream.py` from the repository root.
+"""
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from common import timed
+from BatchStream import BatchStream
+from ReplayBuffer import ReplayBuffer
+
+
+def dense(examples, batchSize):
+    boards, pis, vs = list(zip(*examples))
+    boards, pis, vs = np.asarray(boards), np.asarray(pis), np.asarray(vs)
+    for start in range(0, len(boards), batchSize):
+        _ = boards[start:start + batchSize], pis[start:start + batchSize], vs[start:start + batchSize]
+
+
+def stream(examples, batchSize):
+    for _ in BatchStream(examples, batchSize, epochs=1):
+        pass
+
+
+def peak(fn, *args):
+    tracemalloc.start()
+    _, seconds = timed(fn, *args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--examples', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    opts = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    boards = rng.randint(-1, 2, size=(opts.examples, 11, 11))
+    pis = rng.dirichlet(np.ones(121), size=opts.examples).astype(np.float32)
+    vs = rng.choice([-1.0, 1.0], size=opts.examples)
+    examples = list(zip(boards, pis, vs))
+
+    with tempfile.TemporaryDirectory() as folder:
+        buffer = ReplayBuffer(folder, opts.examples)
+        buffer.addIteration(examples)
+        print(f"{'mode':<16}{'peak MB':>9}{'epoch s':>9}")
+        for name, fn, data in (('dense list', dense, examples), ('stream list', stream, examples),
+                               ('stream buffer', stream, buffer)):
+            mb, seconds = peak(fn, data, opts.batch_size)
+            print(f"{name:<16}{mb:>9.1f}{seconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from NeuralNet import NeuralNet
+
+
+class HashNNet(NeuralNet):
+    """
+    A neural network stand-in for benchmarks. The policy and value are a pure
+    function of the board bytes, so different search engines see exactly the
+    same evaluations and only the cost of the search itself is measured.
+    """
+
+    def __init__(self, game):
+        self.action_size = game.getActionSize()
+
+    def predict(self, board):
+        rng = np.random.RandomState(zlib.crc32(np.ascontiguousarray(board).tobytes()))
+        pi = rng.random_sample(self.action_size)
+        return pi / np.sum(pi), rng.uniform(-1, 1)
+
+
+def deep_getsizeof(obj, seen=None):
+    """Returns the size in bytes of obj and everything it references."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_getsizeof(k, seen) + deep_getsizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_getsizeof(x, seen) for x in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_getsizeof(getattr(obj, a), seen) for a in obj.__slots__ if hasattr(obj, a))
+    elif hasattr(obj, '__dict__'):
+        size += deep_getsizeof(obj.__dict__, seen)
+    return size
+
+
+def timed(fn, *args, **kwargs):
+    """Returns (result, seconds) of calling fn."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class DenseNNet(NeuralNet):
+    """
+    A CPU-bound neural network stand-in: a random two-layer perceptron in
+    numpy. Unlike HashNNet its predict_batch really is cheaper per board than
+    predict, so it shows the effect of batching leaf evaluations.
+    """
+
+    def __init__(self, game, hidden=1024, seed=0):
+        rng = np.random.RandomState(seed)
+        inputs = int(np.prod(game.getBoardSize()))
+        self.w1 = rng.standard_normal((inputs, hidden)).astype(np.float32) / np.sqrt(inputs)
+        self.w2 = rng.standard_normal((hidden, hidden)).astype(np.float32) / np.sqrt(hidden)
+        self.wp = rng.standard_normal((hidden, game.getActionSize())).astype(np.float32) / np.sqrt(hidden)
+        self.wv = rng.standard_normal((hidden, 1)).astype(np.float32) / np.sqrt(hidden)
+
+    def predict_batch(self, boards):
+        x = np.stack([np.asarray(b, dtype=np.float32).ravel() for b in boards])
+        h = np.maximum(np.maximum(x @ self.w1, 0) @ self.w2, 0)
+        logits = h @ self.wp
+        pi = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return pi / pi.sum(axis=1, keepdims=True), np.tanh(h @ self.wv).reshape(-1)
+
+    def predict(self, board):
+        pi, v = self.predict_batch([board])
+        return pi[0], v[0]
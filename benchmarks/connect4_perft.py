@@ -0,0 +1,60 @@
+"""
+Perft-style benchmark of the Connect4 engines: counts the positions reachable
+in --depth moves from the initial board and from a random middle-game board,
+with getGameEnded, getValidMoves and getNextState on every position like a
+search does, and reports the positions per second of Connect4Game (numpy
+arrays) and Connect4BitboardGame (two integers per board).
+Use `python benchmarks/connect4_perft.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import timed
+from connect4.Connect4Game import Connect4BitboardGame, Connect4Game
+
+
+def perft(game, board, player, depth):
+    if game.getGameEnded(board, player) != 0:
+        return 1
+    if depth == 0:
+        return 1
+    nodes = 1
+    for action in np.flatnonzero(game.getValidMoves(board, player)):
+        next_board, next_player = game.getNextState(board, player, action)
+        nodes += perft(game, next_board, next_player, depth - 1)
+    return nodes
+
+
+def middle_game(game, moves, seed):
+    rng = np.random.RandomState(seed)
+    board, player = game.getInitBoard(), 1
+    for _ in range(moves):
+        action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+        next_board, next_player = game.getNextState(board, player, action)
+        if game.getGameEnded(next_board, next_player) != 0:
+            break
+        board, player = next_board, next_player
+    return board, player
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--moves', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+
+    print(f"{'engine':<22}{'start':<8}{'positions':>10}{'seconds':>9}{'pos/s':>10}")
+    for game in (Connect4Game(), Connect4BitboardGame()):
+        for start in ('initial', 'middle'):
+            if start == 'initial':
+                board, player = game.getInitBoard(), 1
+            else:
+                board, player = middle_game(game, opts.moves, opts.seed)
+            nodes, seconds = timed(perft, game, board, player, opts.depth)
+            print(f"{type(game).__name__:<22}{start:<8}{nodes:>10}{seconds:>9.2f}{nodes / seconds:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark of Connect4Game.getGameEnded on the boards of random games, with
+the full-board scan of Board.get_win_state (plain arrays) against the check
+of the lines through the last stone (the LastMoveBoard arrays returned by
+getNextState).
+Use `python benchmarks/connect4_win_check.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import timed
+from connect4.Connect4Game import Connect4Game
+
+
+def random_games(game, games, seed):
+    rng = np.random.RandomState(seed)
+    states = []
+    for _ in range(games):
+        board, player = game.getInitBoard(), 1
+        while True:
+            action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+            board, player = game.getNextState(board, player, action)
+            states.append((board, player))
+            if game.getGameEnded(board, player) != 0:
+                break
+    return states
+
+
+def check_all(game, states):
+    return [game.getGameEnded(board, player) for board, player in states]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+
+    game = Connect4Game()
+    states = random_games(game, opts.games, opts.seed)
+    full, t0 = timed(check_all, game, [(np.array(board), player) for board, player in states])
+    last, t1 = timed(check_all, game, states)
+    assert full == last
+    print(f"{len(states)} states: full scan {t0 / len(states) * 1e6:.1f} us, "
+          f"last move {t1 / len(states) * 1e6:.1f} us per call ({t0 / t1:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
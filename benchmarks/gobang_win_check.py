@@ -0,0 +1,71 @@
+"""
+Benchmark of GobangGame.getGameEnded on the boards of random games, with the
+loop over every square and direction it used to run, against the vectorized
+window sums of Board.get_n_in_row (plain arrays) and the check of the lines
+through the last stone (the LastMoveBoard arrays returned by getNextState).
+Use `python benchmarks/gobang_win_check.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import timed
+from gobang.GobangGame import GobangGame
+
+
+def scanned_game_ended(board, n_in_row):
+    n = len(board)
+    for w in range(n):
+        for h in range(n):
+            if (w in range(n - n_in_row + 1) and board[w][h] != 0 and
+                    len(set(board[i][h] for i in range(w, w + n_in_row))) == 1):
+                return board[w][h]
+            if (h in range(n - n_in_row + 1) and board[w][h] != 0 and
+                    len(set(board[w][j] for j in range(h, h + n_in_row))) == 1):
+                return board[w][h]
+            if (w in range(n - n_in_row + 1) and h in range(n - n_in_row + 1) and board[w][h] != 0 and
+                    len(set(board[w + k][h + k] for k in range(n_in_row))) == 1):
+                return board[w][h]
+            if (w in range(n - n_in_row + 1) and h in range(n_in_row - 1, n) and board[w][h] != 0 and
+                    len(set(board[w + l][h - l] for l in range(n_in_row))) == 1):
+                return board[w][h]
+    if np.any(board == 0):
+        return 0
+    return 1e-4
+
+
+def random_games(game, games, seed):
+    rng = np.random.RandomState(seed)
+    states = []
+    for _ in range(games):
+        board, player = game.getInitBoard(), 1
+        while True:
+            action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+            board, player = game.getNextState(board, player, action)
+            states.append((board, player))
+            if game.getGameEnded(board, player) != 0:
+                break
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+
+    print(f"{'board':<7}{'states':>7}{'loop us':>10}{'vector us':>11}{'last us':>9}")
+    for n in (15, 19):
+        game = GobangGame(n, 5)
+        states = random_games(game, opts.games, opts.seed)
+        arrays = [np.array(board) for board, _ in states]
+        loop, t0 = timed(lambda: [scanned_game_ended(board, 5) for board in arrays])
+        full, t1 = timed(lambda: [game.getGameEnded(board, 1) for board in arrays])
+        last, t2 = timed(lambda: [game.getGameEnded(board, 1) for board, _ in states])
+        assert loop == full == last
+        per = 1e6 / len(states)
+        print(f"{n}x{n:<4}{len(states):>7}{t0 * per:>10.1f}{t1 * per:>11.1f}{t2 * per:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
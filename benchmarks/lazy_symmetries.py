@@ -0,0 +1,68 @@
+"""
+Benchmark of args.lazySymmetries, which stores one example per self-play move
+and lets the network draw a random symmetry of it per batch
+(NeuralNet.augmentBatch) instead of storing every symmetry.
+
+Plays the same self-play games both ways and reports the memory held by the
+examples and the time to prepare one epoch of training data the way the Keras
+wrappers do: shuffle, unzip and convert to arrays (plus augmentBatch when
+lazy).
+Use `python benchmarks/lazy_symmetries.py` from the repository root.
+"""
+import argparse
+from random import shuffle
+
+import numpy as np
+
+from common import HashNNet, deep_getsizeof, timed
+from Coach import Coach
+from connect4.Connect4Game import Connect4Game
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from utils import dotdict
+
+GAMES = {
+    'othello-8x8': lambda: OthelloGame(8),
+    'gobang-15x15': lambda: GobangGame(15),
+    'connect4-11x11': lambda: Connect4Game(),
+}
+
+
+def self_play(game, episodes, sims, lazy, seed):
+    np.random.seed(seed)
+    args = dotdict({'numMCTSSims': sims, 'cpuct': 1.0, 'tempThreshold': 15, 'arrayMCTS': True,
+                    'lazySymmetries': lazy})
+    coach = Coach(game, HashNNet(game), args)
+    examples = []
+    for _ in range(episodes):
+        coach.mcts = coach.mctsClass(game, coach.nnet, args)
+        examples += coach.executeEpisode()
+    return coach.nnet, examples
+
+
+def prepare_epoch(nnet, examples):
+    shuffle(examples)
+    boards, pis, vs = list(zip(*examples))
+    boards, pis = nnet.augmentBatch(boards, pis)
+    return np.asarray(boards), np.asarray(pis), np.asarray(vs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--episodes', type=int, default=2)
+    parser.add_argument('--sims', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+
+    print(f"{'game':<16}{'mode':<7}{'examples':>10}{'MB':>9}{'epoch s':>9}")
+    for name, make_game in GAMES.items():
+        game = make_game()
+        for lazy in (False, True):
+            nnet, examples = self_play(game, opts.episodes, opts.sims, lazy, opts.seed)
+            size = deep_getsizeof(examples) / 2 ** 20
+            _, seconds = timed(prepare_epoch, nnet, examples)
+            print(f"{name:<16}{'lazy' if lazy else 'eager':<7}{len(examples):>10}{size:>9.1f}{seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
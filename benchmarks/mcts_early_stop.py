@@ -0,0 +1,74 @@
+"""
+Benchmark of the MCTS early stop for greedy (temp=0) moves.
+
+Plays through a few games with a deterministic fake network and, at every
+position, searches once with the full simulation budget and once with
+args.earlyStop. Reports the simulations skipped, the time saved and checks that
+both searches pick the same move.
+Use `python benchmarks/mcts_early_stop.py` from the repository root.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import HashNNet
+from ArrayMCTS import ArrayMCTS
+from MCTS import MCTS
+from connect4.Connect4Game import Connect4Game
+from othello.OthelloGame import OthelloGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import dotdict
+
+GAMES = {
+    'tictactoe': lambda: TicTacToeGame(),
+    'othello-6x6': lambda: OthelloGame(6),
+    'connect4': lambda: Connect4Game(),
+}
+
+
+def positions(game, count, seed):
+    """Returns up to count canonical boards from one random game."""
+    rng = np.random.RandomState(seed)
+    board, player = game.getInitBoard(), 1
+    boards = []
+    while len(boards) < count and game.getGameEnded(board, player) == 0:
+        canonical = game.getCanonicalForm(board, player)
+        boards.append(canonical)
+        action = rng.choice(np.flatnonzero(game.getValidMoves(canonical, 1)))
+        board, player = game.getNextState(board, player, action)
+    return boards
+
+
+def run(engine, game, boards, args):
+    moves, sims, seconds = [], 0, 0.0
+    for board in boards:
+        mcts = engine(game, HashNNet(game), args)
+        moves.append(int(np.argmax(mcts.getActionProb(board, temp=0))))
+        sims += mcts.searchStats.simulations
+        seconds += mcts.searchStats.seconds
+    return moves, sims, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sims', type=int, default=200)
+    parser.add_argument('--positions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+
+    print(f"{'game':<14}{'engine':<11}{'sims':>8}{'early':>8}{'full s':>9}{'early s':>9}{'saved':>8}  same move")
+    for name, make_game in GAMES.items():
+        game = make_game()
+        boards = positions(game, opts.positions, opts.seed)
+        for engine in (MCTS, ArrayMCTS):
+            args = dotdict({'numMCTSSims': opts.sims, 'cpuct': 1.0})
+            full_moves, full_sims, full_s = run(engine, game, boards, args)
+            args.earlyStop = True
+            early_moves, early_sims, early_s = run(engine, game, boards, args)
+            print(f"{name:<14}{engine.__name__:<11}{full_sims:>8}{early_sims:>8}{full_s:>9.3f}{early_s:>9.3f}"
+                  f"{1 - early_s / full_s:>8.0%}  {full_moves == early_moves}")
+
+
+if __name__ == "__main__":
+    main()
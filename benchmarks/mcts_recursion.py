@@ -0,0 +1,68 @@
+"""
+Compares the iterative MCTS.search with the recursive searchRecursive.
+
+Both engines play the same self-play game under a fixed seed; the benchmark
+checks that they produce identical visit counts at every move and reports the
+average time per simulation.
+Use `python benchmarks/mcts_recursion.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import HashNNet, timed
+from MCTS import MCTS
+from connect4.Connect4Game import Connect4Game
+from dotsandboxes.DotsAndBoxesGame import DotsAndBoxesGame
+from gobang.GobangGame import GobangGame
+from utils import dotdict
+
+GAMES = {
+    'connect4-11x11': lambda: Connect4Game(),
+    'gobang-9x9': lambda: GobangGame(9),
+    'dotsandboxes-5': lambda: DotsAndBoxesGame(5),
+}
+
+
+class RecursiveMCTS(MCTS):
+    def search(self, canonicalBoard):
+        return self.searchRecursive(canonicalBoard)
+
+
+def play(engine, game, args, seed, moves):
+    """Plays up to moves moves of self-play, returns (counts per move, seconds)."""
+    np.random.seed(seed)
+    mcts = engine(game, HashNNet(game), args)
+    board, player = game.getInitBoard(), 1
+    history, seconds = [], 0.0
+    for _ in range(moves):
+        canonical = game.getCanonicalForm(board, player)
+        pi, t = timed(mcts.getActionProb, canonical, temp=1)
+        seconds += t
+        history.append(mcts.getCounts(canonical))
+        board, player = game.getNextState(board, player, np.random.choice(len(pi), p=pi))
+        if game.getGameEnded(board, player) != 0:
+            break
+    return history, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sims', type=int, default=100)
+    parser.add_argument('--moves', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+    args = dotdict({'numMCTSSims': opts.sims, 'cpuct': 1.0})
+
+    print(f"{'game':<16}{'recursive us/sim':>18}{'iterative us/sim':>18}{'speedup':>9}")
+    for name, make_game in GAMES.items():
+        game = make_game()
+        rec_counts, rec = play(RecursiveMCTS, game, args, opts.seed, opts.moves)
+        it_counts, it = play(MCTS, game, args, opts.seed, opts.moves)
+        assert rec_counts == it_counts, 'iterative search diverged from the recursive one'
+        sims = len(it_counts) * opts.sims
+        print(f"{name:<16}{rec / sims * 1e6:>18.1f}{it / sims * 1e6:>18.1f}{rec / it:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
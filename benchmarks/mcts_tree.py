@@ -0,0 +1,58 @@
+"""
+Compares the dict-backed MCTS with the array-backed ArrayMCTS.
+
+Reports simulations per second and bytes per stored state for a few games.
+Use `python benchmarks/mcts_tree.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import HashNNet, deep_getsizeof, timed
+from ArrayMCTS import ArrayMCTS
+from MCTS import MCTS
+from connect4.Connect4Game import Connect4Game
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from utils import dotdict
+
+GAMES = {
+    'connect4-11x11': lambda: Connect4Game(),
+    'othello-8x8': lambda: OthelloGame(8),
+    'gobang-15x15': lambda: GobangGame(15),
+}
+
+
+def run(engine, game, args):
+    mcts = engine(game, HashNNet(game), args)
+    board = game.getCanonicalForm(game.getInitBoard(), 1)
+    _, seconds = timed(mcts.getActionProb, board, temp=1)
+    if isinstance(mcts, ArrayMCTS):
+        states = len(mcts.nodes)
+        nbytes = deep_getsizeof(mcts.nodes)
+    else:
+        states = len(mcts.Es)
+        nbytes = sum(deep_getsizeof(d) for d in (mcts.Qsa, mcts.Nsa, mcts.Ns, mcts.Ps, mcts.Es, mcts.Vs))
+    return args.numMCTSSims / seconds, nbytes / max(states, 1), mcts.getCounts(board)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sims', type=int, default=400)
+    parser.add_argument('--games', nargs='*', default=list(GAMES))
+    opts = parser.parse_args()
+    args = dotdict({'numMCTSSims': opts.sims, 'cpuct': 1.0})
+
+    print(f"{'game':<16}{'engine':<11}{'sims/sec':>10}{'bytes/node':>12}")
+    for name in opts.games:
+        game = GAMES[name]()
+        results = {}
+        for engine in (MCTS, ArrayMCTS):
+            sps, bpn, counts = run(engine, game, args)
+            results[engine.__name__] = counts
+            print(f"{name:<16}{engine.__name__:<11}{sps:>10.1f}{bpn:>12.0f}")
+        assert np.array_equal(results['MCTS'], results['ArrayMCTS']), 'engines disagree on visit counts'
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Perft-style benchmark of the Othello engines: counts the positions reachable
+in --depth moves (passes included) from the initial board, with
+getGameEnded, getValidMoves and getNextState on every position like a search
+does, and reports the positions per second of OthelloGame with the list
+based Board and with bitboard=True.
+Use `python benchmarks/othello_perft.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import timed
+from othello.OthelloGame import OthelloGame
+
+
+def perft(game, board, player, depth):
+    if depth == 0 or game.getGameEnded(board, player) != 0:
+        return 1
+    nodes = 1
+    for action in np.flatnonzero(game.getValidMoves(board, player)):
+        next_board, next_player = game.getNextState(board, player, action)
+        nodes += perft(game, next_board, next_player, depth - 1)
+    return nodes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=4)
+    opts = parser.parse_args()
+
+    print(f"{'board':<7}{'engine':<10}{'positions':>10}{'seconds':>9}{'pos/s':>9}")
+    for n in (6, 8):
+        for bitboard in (False, True):
+            game = OthelloGame(n, bitboard=bitboard)
+            nodes, seconds = timed(perft, game, game.getInitBoard(), 1, opts.depth)
+            print(f"{f'{n}x{n}':<7}{'bitboard' if bitboard else 'Board':<10}{nodes:>10}{seconds:>9.2f}"
+                  f"{nodes / seconds:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
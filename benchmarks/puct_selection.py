@@ -0,0 +1,90 @@
+"""
+Micro-benchmark of the per-node PUCT child selection in MCTS.
+
+For every game in the repository a node is filled with random statistics and
+the time to pick a child is measured for the vectorized MCTS.selectAction and
+for the per-action Python loop it replaced.
+Use `python benchmarks/puct_selection.py` from the repository root.
+"""
+import argparse
+import math
+import timeit
+
+import numpy as np
+
+import common  # noqa: F401 (puts the repository root on sys.path)
+from MCTS import MCTS, EPS
+from connect4.Connect4Game import Connect4Game
+from dotsandboxes.DotsAndBoxesGame import DotsAndBoxesGame
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from rts.RTSGame import RTSGame
+from santorini.SantoriniGame import SantoriniGame
+from tafl.TaflGame import TaflGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+from tictactoe_3d.TicTacToeGame import TicTacToeGame as TicTacToe3DGame
+from utils import dotdict
+
+GAMES = {
+    'tictactoe': lambda: TicTacToeGame(),
+    'tictactoe3d': lambda: TicTacToe3DGame(3),
+    'othello-8x8': lambda: OthelloGame(8),
+    'gobang-15x15': lambda: GobangGame(15),
+    'connect4-11x11': lambda: Connect4Game(),
+    'dotsandboxes-3': lambda: DotsAndBoxesGame(3),
+    'santorini-5': lambda: SantoriniGame(5),
+    'tafl-brandubh': lambda: TaflGame('Brandubh'),
+    'rts': lambda: RTSGame(),
+}
+
+
+def loop_select(args, Qsa, Nsa, Ns, Ps, valids, s, action_size):
+    """The per-action loop MCTS.search used before selection was vectorized."""
+    cur_best = -float('inf')
+    best_act = -1
+    for a in range(action_size):
+        if valids[a]:
+            if (s, a) in Qsa:
+                u = Qsa[(s, a)] + args.cpuct * Ps[s][a] * math.sqrt(Ns[s]) / (1 + Nsa[(s, a)])
+            else:
+                u = args.cpuct * Ps[s][a] * math.sqrt(Ns[s] + EPS)
+            if u > cur_best:
+                cur_best = u
+                best_act = a
+    return best_act
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+    args = dotdict({'cpuct': 1.0})
+    rng = np.random.RandomState(opts.seed)
+
+    print(f"{'game':<16}{'actions':>8}{'valid':>7}{'loop us':>10}{'numpy us':>10}{'speedup':>9}")
+    for name, make_game in GAMES.items():
+        game = make_game()
+        size = game.getActionSize()
+        # a mid-search node: all actions valid, half of them visited
+        valids = np.ones(size, dtype=np.int64)
+        Ps = rng.random_sample(size)
+        Ps /= Ps.sum()
+        N = np.where(rng.random_sample(size) < 0.5, rng.randint(1, 20, size), 0)
+        Q = np.where(N > 0, rng.uniform(-1, 1, size), 0.0)
+
+        mcts = MCTS(game, None, args)
+        mcts.Ps['s'], mcts.Vs['s'], mcts.Ns['s'] = Ps, valids, int(N.sum())
+        mcts.Qsa['s'], mcts.Nsa['s'] = Q, N
+        Qsa = {('s', a): Q[a] for a in range(size) if N[a] > 0}
+        Nsa = {('s', a): N[a] for a in range(size) if N[a] > 0}
+        loop_args = (args, Qsa, Nsa, mcts.Ns, mcts.Ps, valids, 's', size)
+
+        assert mcts.selectAction('s') == loop_select(*loop_args)
+        loop = timeit.timeit(lambda: loop_select(*loop_args), number=opts.number) / opts.number
+        vect = timeit.timeit(lambda: mcts.selectAction('s'), number=opts.number) / opts.number
+        print(f"{name:<16}{size:>8}{int(valids.sum()):>7}{loop * 1e6:>10.1f}{vect * 1e6:>10.1f}{loop / vect:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark of Coach.executeEpisodes, the driver that plays several self-play
+games side by side and evaluates their leaves in one batched network call.
+
+Reports self-play throughput for a range of game counts, against the one game
+at a time Coach.executeEpisode, with a numpy perceptron standing in for the
+network so that batching has a real cost model on CPU.
+Use `python benchmarks/selfplay_games.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import DenseNNet, timed
+from Coach import Coach
+from connect4.Connect4Game import Connect4Game
+from utils import dotdict
+
+
+def serial(coach, episodes):
+    """The one game at a time loop of Coach.learn."""
+    for _ in range(episodes):
+        coach.mcts = coach.mctsClass(coach.game, coach.nnet, coach.args)
+        coach.executeEpisode()
+
+
+def side_by_side(coach, episodes, games):
+    for start in range(0, episodes, games):
+        coach.executeEpisodes(min(games, episodes - start))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--episodes', type=int, default=16)
+    parser.add_argument('--sims', type=int, default=25)
+    parser.add_argument('--games', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+
+    game = Connect4Game()
+    args = dotdict({'numMCTSSims': opts.sims, 'cpuct': 1.0, 'tempThreshold': 15, 'arrayMCTS': True,
+                    'reuseTree': True})
+    coach = Coach(game, DenseNNet(game), args)
+
+    np.random.seed(opts.seed)
+    _, base = timed(serial, coach, opts.episodes)
+    print(f"{'games':>6}{'seconds':>10}{'episodes/h':>12}{'speedup':>9}")
+    print(f"{'serial':>6}{base:>10.2f}{opts.episodes / base * 3600:>12.0f}{1:>8.1f}x")
+    for n in opts.games:
+        np.random.seed(opts.seed)
+        _, seconds = timed(side_by_side, coach, opts.episodes, n)
+        print(f"{n:>6}{seconds:>10.2f}{opts.episodes / seconds * 3600:>12.0f}{base / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
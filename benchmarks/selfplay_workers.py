@@ -0,0 +1,53 @@
+"""
+Scaling benchmark of Coach.selfPlayInWorkers, the process-pool self-play.
+
+Plays the same episodes with a growing number of worker processes and reports
+the throughput against playing them in this process. The network is the
+numpy perceptron of common.py, which has no checkpoint to load, so only
+self-play itself is measured.
+Use `python benchmarks/selfplay_workers.py` from the repository root.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from common import DenseNNet, timed
+from Coach import Coach
+from connect4.Connect4Game import Connect4Game
+from utils import dotdict
+
+
+def in_process(coach, episodes):
+    """Plays the episodes of selfPlayInWorkers, with the same seeds, in this process."""
+    for episode in range(episodes):
+        np.random.seed(coach.episodeSeed(1, episode))
+        coach.mcts = coach.mctsClass(coach.game, coach.nnet, coach.args)
+        coach.executeEpisode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--episodes', type=int, default=16)
+    parser.add_argument('--sims', type=int, default=25)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    opts = parser.parse_args()
+
+    game = Connect4Game()
+    with tempfile.TemporaryDirectory() as folder:
+        args = dotdict({'numMCTSSims': opts.sims, 'cpuct': 1.0, 'tempThreshold': 15, 'arrayMCTS': True,
+                        'numEps': opts.episodes, 'checkpoint': folder})
+        coach = Coach(game, DenseNNet(game), args)
+        _, base = timed(in_process, coach, opts.episodes)
+        print(f'{os.cpu_count()} cores')
+        print(f"{'workers':>8}{'seconds':>10}{'episodes/h':>12}{'speedup':>9}")
+        print(f"{'-':>8}{base:>10.2f}{opts.episodes / base * 3600:>12.0f}{1:>8.1f}x")
+        for workers in opts.workers:
+            args.selfPlayWorkers = workers
+            _, seconds = timed(lambda: list(coach.selfPlayInWorkers(1)))
+            print(f"{workers:>8}{seconds:>10.2f}{opts.episodes / seconds * 3600:>12.0f}{base / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
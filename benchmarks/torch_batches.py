@@ -0,0 +1,74 @@
+"""
+Benchmark of the batch assembly in the pytorch wrappers' train, in samples
+per second.
+
+before: the examples of every batch are zipped, converted to a float64
+        array and then copied into a float32 tensor.
+after:  the examples are packed once into float32 ExampleArrays and a
+        BatchStream thread gathers every batch by index, which torch shares
+        without a copy.
+
+Only the batches of --epochs epochs are built, no network is trained, so the
+packing is amortized over the epochs like in train. The tensors are made with
+torch when it is installed, otherwise with the equivalent float32 numpy copy.
+Use `python benchmarks/torch_batches.py` from the repository root.
+"""
+import argparse
+
+import numpy as np
+
+from common import timed
+from BatchStream import BatchStream, ExampleArrays
+
+try:
+    import torch
+    FloatTensor, from_numpy = torch.FloatTensor, torch.from_numpy
+except ImportError:
+    torch = None
+    FloatTensor, from_numpy = lambda a: np.array(a, dtype=np.float32), np.asarray
+
+GAMES = {
+    'othello-8x8': ((8, 8), 65),
+    'tafl-11x11': ((11, 11), 11 ** 4),
+}
+
+
+def before(examples, batchSize, epochs):
+    for _ in range(epochs * (len(examples) // batchSize)):
+        sample_ids = np.random.randint(len(examples), size=batchSize)
+        boards, pis, vs = list(zip(*[examples[i] for i in sample_ids]))
+        FloatTensor(np.array(boards).astype(np.float64))
+        FloatTensor(np.array(pis))
+        FloatTensor(np.array(vs).astype(np.float64))
+
+
+def after(examples, batchSize, epochs):
+    arrays = ExampleArrays(examples, np.float32)
+    for boards, (pis, vs) in BatchStream(arrays, batchSize, epochs, dtype=np.float32, replacement=True):
+        from_numpy(boards), from_numpy(pis), from_numpy(vs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--examples', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--epochs', type=int, default=10)
+    opts = parser.parse_args()
+
+    batches = opts.epochs * (opts.examples // opts.batch_size)
+    print(f"tensors from {'torch' if torch else 'numpy'}, {opts.epochs} epochs of {batches // opts.epochs} batches")
+    print(f"{'game':<14}{'before/s':>11}{'after/s':>11}{'speedup':>9}")
+    rng = np.random.RandomState(0)
+    for name, (shape, actions) in GAMES.items():
+        boards = rng.randint(-1, 2, size=(opts.examples,) + shape)
+        pis = rng.dirichlet(np.ones(min(actions, 200)), size=opts.examples)
+        pis = np.pad(pis, ((0, 0), (0, actions - pis.shape[1])))
+        examples = list(zip(boards, pis, rng.choice([-1, 1], size=opts.examples)))
+        _, t0 = timed(before, examples, opts.batch_size, opts.epochs)
+        _, t1 = timed(after, examples, opts.batch_size, opts.epochs)
+        samples = batches * opts.batch_size
+        print(f"{name:<14}{samples / t0:>11.0f}{samples / t1:>11.0f}{t0 / t1:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
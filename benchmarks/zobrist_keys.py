@@ -0,0 +1,85 @@
+"""
+Measures Zobrist state keys (game.hashKey) against board.tostring() keys
+(game.stringRepresentation).
+
+Othello is not measured. A move flips a variable set of cells, so it has no
+incremental key, and hashing every visited board in full costs more than it
+saves; it keeps the default stringRepresentation key.
+
+For every game, positions from random playouts are used to count key
+collisions and to time key computation; then MCTS is run with both kinds of
+keys to compare simulations per second and bytes per stored state.
+Use `python benchmarks/zobrist_keys.py` from the repository root.
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from common import HashNNet, deep_getsizeof, timed
+from MCTS import MCTS
+from connect4.Connect4Game import Connect4Game
+from gobang.GobangGame import GobangGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import dotdict
+
+GAMES = {
+    'tictactoe': lambda: TicTacToeGame(),
+    'connect4-11x11': lambda: Connect4Game(),
+    'gobang-15x15': lambda: GobangGame(15),
+}
+
+
+def random_positions(game, count, rng):
+    """Returns up to count canonical boards seen in random playouts."""
+    boards = []
+    while len(boards) < count:
+        board, player = game.getInitBoard(), 1
+        while game.getGameEnded(board, player) == 0 and len(boards) < count:
+            canonical = game.getCanonicalForm(board, player)
+            boards.append(canonical)
+            valids = np.flatnonzero(game.getValidMoves(canonical, 1))
+            board, player = game.getNextState(board, player, rng.choice(valids))
+    return boards
+
+
+def mcts_stats(game, args, key):
+    mcts = MCTS(game, HashNNet(game), args)
+    mcts.hashKey = key
+    mcts.incrementalKeys = mcts.incrementalKeys and key == game.hashKey
+    board = game.getCanonicalForm(game.getInitBoard(), 1)
+    _, seconds = timed(mcts.getActionProb, board, temp=1)
+    nbytes = sum(deep_getsizeof(d) for d in (mcts.Qsa, mcts.Nsa, mcts.Ns, mcts.Ps, mcts.Es, mcts.Vs))
+    return args.numMCTSSims / seconds, nbytes / len(mcts.Es)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--positions', type=int, default=20000)
+    parser.add_argument('--sims', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=0)
+    opts = parser.parse_args()
+    args = dotdict({'numMCTSSims': opts.sims, 'cpuct': 1.0})
+    rng = np.random.RandomState(opts.seed)
+
+    print(f"{'game':<16}{'states':>8}{'collisions':>11}{'bytes us':>10}{'zobrist us':>11}"
+          f"{'bytes sims/s':>14}{'zobrist sims/s':>16}{'bytes B/node':>14}{'zobrist B/node':>16}")
+    for name, make_game in GAMES.items():
+        game = make_game()
+        boards = random_positions(game, opts.positions, rng)
+        by_bytes = {game.stringRepresentation(b) for b in boards}
+        by_key = {game.hashKey(b) for b in boards}
+        collisions = len(by_bytes) - len(by_key)
+
+        sample = boards[:1000]
+        t_bytes = timeit.timeit(lambda: [game.stringRepresentation(b) for b in sample], number=3) / (3 * len(sample))
+        t_key = timeit.timeit(lambda: [game.hashKey(b) for b in sample], number=3) / (3 * len(sample))
+
+        sps_bytes, bpn_bytes = mcts_stats(game, args, game.stringRepresentation)
+        sps_key, bpn_key = mcts_stats(game, args, game.hashKey)
+        print(f"{name:<16}{len(by_bytes):>8}{collisions:>11}{t_bytes * 1e6:>10.2f}{t_key * 1e6:>11.2f}"
+              f"{sps_bytes:>14.1f}{sps_key:>16.1f}{bpn_bytes:>14.0f}{bpn_key:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
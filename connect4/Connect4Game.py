@@ -3,10 +3,11 @@ import numpy as np
 
 sys.path.append('..')
 from Game import Game
-from .Connect4Logic import Board
+from utils import LastMoveBoard, ZobristKeys
+from .Connect4Logic import Bitboard, Board
 
 
-class Connect4Game(Game):
+class Connect4Game(ZobristKeys, Game):
     """
     Connect4 Game class implementing the alpha-zero-general Game interface.
     """
@@ -14,6 +15,8 @@ class Connect4Game(Game):
     def __init__(self, height=None, width=None, np_pieces=None):
         Game.__init__(self)
         self._base_board = Board(height, width, np_pieces)
+        self.initZobrist()
+        self._symmetries = None  # see getSymmetryPermutations
 
     def getInitBoard(self):
         return self._base_board.np_pieces
@@ -22,21 +25,26 @@ class Connect4Game(Game):
         return (self._base_board.height, self._base_board.width)
 
     def getActionSize(self):
-        return self._base_board.width ** 2
+        return self._base_board.height * self._base_board.width
 
     def getNextState(self, board, player, action):
         """Returns a copy of the board with updated move, original board is unmodified."""
-        b = self._base_board.with_np_pieces(np_pieces=np.copy(board))
+        b = self._base_board.with_np_pieces(np_pieces=np.copy(board).view(LastMoveBoard))
         b.add_stone(action, player)
+        b.np_pieces.last_move = action
         return b.np_pieces, -player
 
     def getValidMoves(self, board, player):
         "Any zero value in top row in a valid move"
         return self._base_board.with_np_pieces(np_pieces=board).get_valid_moves()
 
-    def getGameEnded(self, board, player):
+    def getWinState(self, board):
         b = self._base_board.with_np_pieces(np_pieces=board)
-        winstate = b.get_win_state()
+        last_move = getattr(board, 'last_move', None)
+        return b.get_win_state() if last_move is None else b.get_last_move_win_state(last_move)
+
+    def getGameEnded(self, board, player):
+        winstate = self.getWinState(board)
         if winstate.is_ended:
             if winstate.winner == player:
                 return +1
@@ -52,63 +60,57 @@ class Connect4Game(Game):
 
     def getCanonicalForm(self, board, player):
         # Flip player from 1 to -1
-        return board * player
-
-    def getSymmetries(self, board, pi):
-        pi_board = np.reshape(pi, (11, 11))
-        l = []
-        l += [(board, list(pi_board.ravel()))]
-
-        for i in range(1,11): # horizontal
-            shifted_board = np.roll(board, i, axis=1)
-            shifted_pi_board = np.roll(pi_board, i, axis=1)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-    
-        for i in range(1,11): # vertical
-            shifted_board = np.roll(board, i, axis=0)
-            shifted_pi_board = np.roll(pi_board, i, axis=0)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-    
-        newB = np.rot90(board, 1)
-        newPi = np.rot90(pi_board, 1)
-
-        for i in range(1,11): # horizontal
-            shifted_board = np.roll(newB, i, axis=1)
-            shifted_pi_board = np.roll(newPi, i, axis=1)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-    
-        for i in range(1,11): # vertical
-            shifted_board = np.roll(newB, i, axis=0)
-            shifted_pi_board = np.roll(newPi, i, axis=0)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-    
-        newB = np.rot90(board, 2)
-        newPi = np.rot90(pi_board, 2)
-
-        for i in range(1,11): # horizontal
-            shifted_board = np.roll(newB, i, axis=1)
-            shifted_pi_board = np.roll(newPi, i, axis=1)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-    
-        for i in range(1,11): # vertical
-            shifted_board = np.roll(newB, i, axis=0)
-            shifted_pi_board = np.roll(newPi, i, axis=0)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-
-        newB = np.rot90(board, 3)
-        newPi = np.rot90(pi_board, 3)
-
-        for i in range(1,11): # horizontal
-            shifted_board = np.roll(newB, i, axis=1)
-            shifted_pi_board = np.roll(newPi, i, axis=1)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-    
-        for i in range(1,11): # vertical
-            shifted_board = np.roll(newB, i, axis=0)
-            shifted_pi_board = np.roll(newPi, i, axis=0)
-            l += [(shifted_board, list(shifted_pi_board.ravel()))]
-
-        return l
+        canonical = board * player
+        if isinstance(canonical, LastMoveBoard):
+            canonical.last_move = board.last_move
+        return canonical
+
+    def getSymmetryPermutations(self):
+        """
+        Returns:
+            perms: an array with one row per symmetry, giving for every cell of
+                   the symmetric board the flat index of the cell it comes
+                   from. Actions are cells, so policies are permuted the same
+                   way.
+
+        The symmetries are the horizontal and the vertical shifts of the board
+        and of its rotations by 180 degrees, and by 90 and 270 degrees if the
+        board is square (a rotation itself only comes shifted).
+        """
+        if self._symmetries is None:
+            height, width = self.getBoardSize()
+            cells = np.arange(height * width).reshape(height, width)
+            perms = [cells]
+            for k in range(4):
+                if k % 2 and height != width:
+                    continue
+                rotated = np.rot90(cells, k)
+                perms += [np.roll(rotated, i, axis=1) for i in range(1, width)]  # horizontal
+                perms += [np.roll(rotated, i, axis=0) for i in range(1, height)]  # vertical
+            self._symmetries = np.array([perm.ravel() for perm in perms])
+        return self._symmetries
+
+    def getSymmetries(self, board, pi, k=None):
+        """
+        All the symmetric forms are gathered with one indexing operation and
+        returned as views of the rows of one array. Symmetries that give the
+        same board (the first one is kept), as is common early in the game,
+        are dropped. With k, only k of them drawn at random are returned.
+        """
+        perms = self.getSymmetryPermutations()
+        boards = np.asarray(board).ravel()[perms]
+        seen = {}
+        for i, row in enumerate(boards):
+            seen.setdefault(row.tobytes(), i)
+        keep = np.fromiter(seen.values(), dtype=np.intp)
+        if k is not None and k < len(keep):
+            keep = np.sort(np.random.choice(keep, k, replace=False))
+        boards = boards[keep].reshape((len(keep),) + np.shape(board))
+        pis = np.asarray(pi)[perms[keep]]
+        return list(zip(boards, pis))
+
+    def sampleSymmetries(self, board, pi, k):
+        return self.getSymmetries(board, pi, k)
 
     def stringRepresentation(self, board):
         return board.tostring()
@@ -118,4 +120,59 @@ class Connect4Game(Game):
         print(" -----------------------")
         print(' '.join(map(str, range(len(board[0])))))
         print(board)
-        print(" -----------------------")
\ No newline at end of file
+        print(" -----------------------")
+
+
+class Connect4BitboardGame(Connect4Game):
+    """
+    Connect4Game on Bitboard states: two integers with one bit per cell
+    instead of an int array, so moves, valid moves, the end of game check and
+    the keys are bitwise operations on immutable boards.
+
+    The boards only become arrays at the network boundary: np.asarray works
+    on them (the wrappers and the example stores convert the boards they
+    get) and getSymmetries returns arrays. Methods also accept array boards,
+    e.g. the symmetric boards of MCTS.representative.
+    """
+
+    def getInitBoard(self):
+        return Bitboard.from_array(self._base_board.np_pieces)
+
+    def toBitboard(self, board):
+        return board if isinstance(board, Bitboard) else Bitboard.from_array(board)
+
+    def getNextState(self, board, player, action):
+        return self.toBitboard(board).add_stone(action, player), -player
+
+    def getValidMoves(self, board, player):
+        return self.toBitboard(board).get_valid_moves()
+
+    def getWinState(self, board):
+        return self.toBitboard(board).get_win_state()
+
+    def getCanonicalForm(self, board, player):
+        board = self.toBitboard(board)
+        return board if player == 1 else board.negate()
+
+    def getSymmetries(self, board, pi, k=None):
+        return Connect4Game.getSymmetries(self, np.asarray(board), pi, k)
+
+    def stringRepresentation(self, board):
+        return self.hashKey(board)
+
+    def hashKey(self, board):
+        # the exact position, white stones in the low bits and black above
+        return self.toBitboard(board).key()
+
+    def getNextHashKey(self, key, board, player, action):
+        return key | 1 << (int(action) if player == 1 else int(action) + self.getActionSize())
+
+    def getCanonicalHashKey(self, key, player):
+        if player == 1:
+            return key
+        cells = self.getActionSize()
+        return key >> cells | (key & ((1 << cells) - 1)) << cells
+
+    @staticmethod
+    def display(board):
+        Connect4Game.display(np.asarray(board))
@@ -1,4 +1,5 @@
 from collections import namedtuple
+from functools import lru_cache
 import numpy as np
 import copy
 
@@ -125,6 +126,32 @@ class Board():
 
         return WinState(False, None)
 
+    def get_last_move_win_state(self, action):
+        """
+        Same result as get_win_state, for a board that was not ended before the
+        stone at action was placed: only a line of five through that stone can
+        have been made, so only the four lines through it are walked, wrapping
+        around the edges.
+        """
+        board = self.np_pieces
+        y, x = divmod(action, self.width)
+        color = board[y, x]
+        for dy, dx in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+            count = 1
+            for sign in (1, -1):
+                cur_y, cur_x = y, x
+                while count < 5:
+                    cur_y, cur_x = (cur_y + sign * dy) % self.height, (cur_x + sign * dx) % self.width
+                    if board[cur_y, cur_x] != color:
+                        break
+                    count += 1
+            if count == 5:
+                return WinState(True, color)
+
+        if board.all():  # no blank left, a draw
+            return WinState(True, -0.01)
+        return WinState(False, None)
+
     def with_np_pieces(self, np_pieces):
         """Create copy of board with specified pieces."""
         if np_pieces is None:
@@ -132,4 +159,149 @@ class Board():
         return Board(self.height, self.width, np_pieces)
 
     def __str__(self):
-        return str(self.np_pieces)
\ No newline at end of file
+        return str(self.np_pieces)
+
+
+BitboardMasks = namedtuple('BitboardMasks', 'height width cells full first_col last_col first_row last_row')
+
+
+@lru_cache(maxsize=None)
+def bitboard_masks(height, width):
+    """Masks of the cells of a height x width Bitboard, cell (y, x) is bit y * width + x."""
+    cells = height * width
+    first_col = sum(1 << (y * width) for y in range(height))
+    return BitboardMasks(height, width, cells, (1 << cells) - 1, first_col, first_col << (width - 1),
+                         (1 << width) - 1, ((1 << width) - 1) << (width * (height - 1)))
+
+
+@lru_cache(maxsize=None)
+def bitboard_lines(height, width):
+    """For every cell, the masks of the 20 lines of five cells through it, wrapping around the edges."""
+    lines = []
+    for y in range(height):
+        for x in range(width):
+            cell_lines = []
+            for dy, dx in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+                for start in range(-4, 1):
+                    cell_lines.append(sum(1 << ((y + (start + i) * dy) % height * width + (x + (start + i) * dx) % width)
+                                          for i in range(5)))
+            lines.append(tuple(cell_lines))
+    return lines
+
+
+class Bitboard():
+    """
+    Connect4 board as two integers with one bit per cell, the stones of player
+    1 (white) and those of player -1 (black), for Connect4BitboardGame. Moves,
+    valid moves, the five in a row check (wrapping around the edges like
+    Board.get_win_state) and the key are all bitwise operations, and a move
+    makes a new Bitboard instead of copying an array. Like the LastMoveBoard of utils, a
+    Bitboard made by add_stone remembers the stone, and only the lines of five
+    through it are checked for a win.
+
+    np.asarray(bitboard) gives the same array as the np_pieces of Board, which
+    is what the neural network gets.
+    """
+    __slots__ = ('white', 'black', 'masks', 'last_move')
+
+    def __init__(self, white, black, masks, last_move=None):
+        self.white = white
+        self.black = black
+        self.masks = masks
+        self.last_move = last_move
+
+    @classmethod
+    def from_array(cls, np_pieces):
+        masks = bitboard_masks(*np.shape(np_pieces))
+        np_pieces = np.asarray(np_pieces).ravel()
+        return cls(cls.to_int(np_pieces == 1), cls.to_int(np_pieces == -1), masks)
+
+    @staticmethod
+    def to_int(cells):
+        return int.from_bytes(np.packbits(cells, bitorder='little').tobytes(), 'little')
+
+    def to_cells(self, bits):
+        nbytes = (self.masks.cells + 7) // 8
+        return np.unpackbits(np.frombuffer(bits.to_bytes(nbytes, 'little'), dtype=np.uint8),
+                             count=self.masks.cells, bitorder='little')
+
+    def __array__(self, dtype=None):
+        pieces = self.to_cells(self.white).astype(int) - self.to_cells(self.black)
+        return pieces.reshape(self.masks.height, self.masks.width).astype(dtype or int, copy=False)
+
+    # a sequence of rows as well, so numpy also converts bitboards nested in lists
+    def __len__(self):
+        return self.masks.height
+
+    def __getitem__(self, index):
+        return np.asarray(self)[index]
+
+    def add_stone(self, action, player):
+        "Create copy of board containing new stone."
+        action = int(action)
+        bit = 1 << action
+        if (self.white | self.black) & bit:
+            raise ValueError("Can't play %s on board %s" % (action, self))
+        if player == 1:
+            return Bitboard(self.white | bit, self.black, self.masks, action)
+        return Bitboard(self.white, self.black | bit, self.masks, action)
+
+    def negate(self):
+        "Board with every stone replaced by one of the other player."
+        return Bitboard(self.black, self.white, self.masks, self.last_move)
+
+    def key(self):
+        "Unique int for the position, white in the low bits and black above them."
+        return self.white | self.black << self.masks.cells
+
+    def get_valid_moves(self):
+        return self.to_cells(self.masks.full & ~(self.white | self.black)).astype(int)
+
+    def shift(self, bits, dy, dx):
+        """
+        Returns:
+            bits: the cells (y, x) whose cell (y + dy, x + dx) is set in bits,
+                  wrapping around the edges, for dy in -1, 0, 1 and dx in 0, 1
+        """
+        m = self.masks
+        if dy == 1:
+            bits = (bits >> m.width) | ((bits & m.first_row) << (m.cells - m.width))
+        elif dy == -1:
+            bits = ((bits & ~m.last_row) << m.width) | (bits >> (m.cells - m.width))
+        if dx == 1:
+            bits = ((bits >> 1) & ~m.last_col) | ((bits & m.first_col) << (m.width - 1))
+        return bits
+
+    def has_five(self, bits):
+        for dy, dx in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+            # cells that start a line of 1, 2, ... stones in the direction
+            line = shifted = bits
+            for _ in range(4):
+                shifted = self.shift(shifted, dy, dx)
+                line &= shifted
+                if not line:
+                    break
+            else:
+                return True
+        return False
+
+    def get_win_state(self):
+        if self.last_move is not None:
+            # same as get_last_move_win_state: only the stone just placed can have made a line
+            color = 1 if self.white >> self.last_move & 1 else -1
+            bits = self.white if color == 1 else self.black
+            for line in bitboard_lines(self.masks.height, self.masks.width)[self.last_move]:
+                if bits & line == line:
+                    return WinState(True, color)
+        else:
+            # same order as Board.get_win_state: black, then white, then a draw
+            if self.has_five(self.black):
+                return WinState(True, -1)
+            if self.has_five(self.white):
+                return WinState(True, 1)
+        if self.white | self.black == self.masks.full:
+            return WinState(True, -0.01)
+        return WinState(False, None)
+
+    def __str__(self):
+        return str(np.asarray(self))
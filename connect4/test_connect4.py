@@ -7,7 +7,8 @@ from collections import namedtuple
 import textwrap
 import numpy as np
 
-from .Connect4Game import Connect4Game
+from .Connect4Game import Connect4BitboardGame, Connect4Game
+from .Connect4Logic import Bitboard, Board
 
 # Tuple of (Board, Player, Game) to simplify testing.
 BPGTuple = namedtuple('BPGTuple', 'board player game')
@@ -165,3 +166,130 @@ def test_immutable_move():
 
     assert original_board_string == game.stringRepresentation(board)
     assert original_board_string != game.stringRepresentation(new_np_pieces)
+
+
+# A full 11x11 board without five in a row in any direction, wrapping around.
+DRAWN_BOARD = np.array([[-1, -1, -1, -1,  1,  1, -1,  1,  1,  1,  1],
+                        [ 1, -1,  1,  1,  1, -1,  1,  1, -1, -1,  1],
+                        [ 1,  1,  1, -1,  1, -1,  1, -1,  1, -1,  1],
+                        [ 1,  1, -1,  1,  1,  1, -1,  1,  1, -1,  1],
+                        [-1,  1, -1,  1, -1,  1, -1, -1,  1, -1, -1],
+                        [ 1, -1, -1,  1, -1, -1, -1,  1, -1,  1,  1],
+                        [-1,  1,  1, -1,  1,  1, -1,  1,  1,  1, -1],
+                        [-1,  1, -1, -1, -1, -1,  1, -1, -1, -1,  1],
+                        [-1,  1,  1,  1, -1, -1,  1, -1,  1, -1, -1],
+                        [ 1,  1,  1, -1, -1, -1,  1, -1, -1, -1,  1],
+                        [ 1, -1,  1,  1, -1, -1, -1,  1, -1, -1, -1]])
+
+
+def assert_same_end_state(game, board, player):
+    """getGameEnded with the last move must match the full-board scan."""
+    full = game.getGameEnded(np.array(board), player)
+    assert getattr(board, 'last_move', None) is not None
+    assert full == game.getGameEnded(board, player), board
+    canonical = game.getCanonicalForm(board, player)
+    assert game.getGameEnded(np.array(canonical), 1) == game.getGameEnded(canonical, 1)
+    return full
+
+
+def test_last_move_win_state_matches_full_scan():
+    """Randomized differential test of the last-move win check."""
+    rng = np.random.RandomState(0)
+    game = Connect4Game()
+    ended = 0
+    for _ in range(30):
+        board, player = game.getInitBoard(), 1
+        while True:
+            action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+            board, player = game.getNextState(board, player, action)
+            if assert_same_end_state(game, board, player) != 0:
+                ended += 1
+                break
+    assert ended == 30
+
+    # draws and wins made by the last stone of a full board
+    assert game.getGameEnded(DRAWN_BOARD, -1) == 0.01
+    for action in rng.choice(121, size=20, replace=False):
+        y, x = divmod(action, 11)
+        board = DRAWN_BOARD.copy()
+        color = board[y, x]
+        board[y, x] = 0
+        for stone in (color, -color):
+            next_board, next_player = game.getNextState(board, stone, action)
+            assert_same_end_state(game, next_board, next_player)
+
+
+def test_bitboard_matches_array_engine():
+    """Randomized differential test of Connect4BitboardGame against Connect4Game."""
+    rng = np.random.RandomState(1)
+    game, bitgame = Connect4Game(), Connect4BitboardGame()
+    for _ in range(20):
+        board, bitboard, player = game.getInitBoard(), bitgame.getInitBoard(), 1
+        key = bitgame.hashKey(bitboard)
+        while True:
+            np.testing.assert_array_equal(board, np.asarray(bitboard))
+            np.testing.assert_array_equal(game.getValidMoves(board, player), bitgame.getValidMoves(bitboard, player))
+            assert key == bitgame.hashKey(bitboard) == bitgame.hashKey(board)
+            for p in (1, -1):
+                assert game.getGameEnded(board, p) == bitgame.getGameEnded(bitboard, p)
+                canonical = bitgame.getCanonicalForm(bitboard, p)
+                np.testing.assert_array_equal(game.getCanonicalForm(board, p), np.asarray(canonical))
+                assert bitgame.getCanonicalHashKey(key, p) == bitgame.hashKey(canonical)
+            if game.getGameEnded(board, player) != 0:
+                break
+            action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+            key = bitgame.getNextHashKey(key, bitboard, player, action)
+            board, _ = game.getNextState(board, player, action)
+            bitboard, player = bitgame.getNextState(bitboard, player, action)
+
+    # arbitrary boards, including ones with lines of both colors
+    for _ in range(200):
+        np_pieces = rng.choice([-1, 0, 1], size=(11, 11), p=[0.3, 0.4, 0.3])
+        assert Board(np_pieces=np_pieces).get_win_state() == Bitboard.from_array(np_pieces).get_win_state()
+    assert Bitboard.from_array(DRAWN_BOARD).get_win_state() == (True, -0.01)
+
+
+def rolled_symmetries(board, pi):
+    """The symmetries of the 11x11 board built one by one with np.roll and np.rot90."""
+    pi_board = np.reshape(pi, np.shape(board))
+    symmetries = [(board, pi_board)]
+    for k in range(4):
+        new_board, new_pi = np.rot90(board, k), np.rot90(pi_board, k)
+        for axis in (1, 0):
+            for i in range(1, len(board)):
+                symmetries.append((np.roll(new_board, i, axis=axis), np.roll(new_pi, i, axis=axis)))
+    return [(b, p.ravel()) for b, p in symmetries]
+
+
+def test_symmetries_are_deduplicated_permutations():
+    rng = np.random.RandomState(2)
+    game = Connect4Game()
+    board = rng.choice([-1, 0, 1], size=(11, 11))
+    pi = rng.random_sample(121)
+    expected = rolled_symmetries(board, pi)
+    symmetries = game.getSymmetries(board, pi)
+    assert len(symmetries) == len(expected) == 81
+    for (b, p), (expected_b, expected_p) in zip(symmetries, expected):
+        np.testing.assert_array_equal(expected_b, b)
+        np.testing.assert_array_equal(expected_p, p)
+
+    # the empty board has a single symmetric form, one stone can only be on its row or its column
+    assert len(game.getSymmetries(game.getInitBoard(), pi)) == 1
+    one_stone = game.getNextState(game.getInitBoard(), 1, 60)[0]
+    assert len(game.getSymmetries(one_stone, pi)) == 21
+
+    sampled = game.getSymmetries(board, pi, k=5)
+    assert len(sampled) == 5
+    assert len({b.tobytes() for b, _ in sampled}) == 5
+    assert all(any(np.array_equal(b, e) for e, _ in expected) for b, _ in sampled)
+
+
+def test_symmetries_of_rectangular_board():
+    game = Connect4Game(height=6, width=7)
+    board = np.arange(42).reshape(6, 7)
+    symmetries = game.getSymmetries(board, np.arange(42))
+    # shifts of the board and of its rotation by 180 degrees
+    assert len(symmetries) == 1 + 2 * (6 + 5)
+    for b, p in symmetries:
+        assert b.shape == (6, 7)
+        np.testing.assert_array_equal(b.ravel(), p)
@@ -19,17 +19,23 @@ g = None
 
 
 # curl -d "board=0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0" -X POST http://localhost:8888/predict
+# An optional "time_budget=0.2" field caps the search at that many seconds.
 @app.route('/predict', methods=['POST'])
 def predict():
     board = np.fromstring(request.form['board'], sep=',').reshape(g.getBoardSize())
+    time_budget = request.form.get('time_budget', type=float)
 
     use_alpha_zero = True
     if use_alpha_zero:
-        action = np.argmax(mcts.getActionProb(board, temp=0))
+        action = np.argmax(mcts.getActionProb(board, temp=0, timeBudget=time_budget))
     else:
         action = GreedyRandomPlayer(g).play(board)
 
     resp = Response(str(action))
+    if use_alpha_zero:
+        resp.headers['X-MCTS-Simulations'] = str(mcts.searchStats.simulations)
+        resp.headers['X-MCTS-Seconds'] = '%.4f' % mcts.searchStats.seconds
+        resp.headers['Access-Control-Expose-Headers'] = 'X-MCTS-Simulations, X-MCTS-Seconds'
     # https://stackoverflow.com/questions/5584923/a-cors-post-request-works-from-plain-javascript-but-why-not-with-jquery
     # https://stackoverflow.com/questions/25860304/how-do-i-set-response-headers-in-flask
     resp.headers['Access-Control-Allow-Origin'] = '*'
@@ -4,6 +4,7 @@ import os
 sys.path.append('..')
 from utils import dotdict
 from NeuralNet import NeuralNet
+from BatchStream import BatchStream
 
 from .DotsAndBoxesNNet import DotsAndBoxesNNet as onnet
 
@@ -44,14 +45,12 @@ class NNetWrapper(NeuralNet):
         """
         examples: list of examples, each example is of form (board, pi, v)
         """
-        input_boards, target_pis, target_vs = list(zip(*examples))
-        input_boards = np.asarray(input_boards)
+        def transform(boards):
+            normalize_score(boards)
+            return boards
 
-        normalize_score(input_boards)
-
-        target_pis = np.asarray(target_pis)
-        target_vs = np.asarray(target_vs)
-        self.nnet.model.fit(x=input_boards, y=[target_pis, target_vs], batch_size=args.batch_size, epochs=args.epochs)
+        batches = BatchStream(examples, args.batch_size, args.epochs, augment=self.augmentBatch, transform=transform)
+        self.nnet.model.fit(iter(batches), steps_per_epoch=len(batches), epochs=args.epochs)
 
     def predict(self, board):
         """
@@ -66,6 +65,17 @@ class NNetWrapper(NeuralNet):
 
         return pi[0], v[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: list of np arrays with boards
+        """
+        boards = np.array(boards)
+        normalize_score(boards)
+
+        pi, v = self.nnet.model.predict(boards, verbose=False)
+
+        return pi, v[:, 0]
+
     def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         # change extension
         filename = filename.split(".")[0] + ".h5"
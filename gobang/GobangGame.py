@@ -2,14 +2,16 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from utils import LastMoveBoard, ZobristKeys
 from .GobangLogic import Board
 import numpy as np
 
 
-class GobangGame(Game):
+class GobangGame(ZobristKeys, Game):
     def __init__(self, n=15, nir=5):
         self.n = n
         self.n_in_row = nir
+        self.initZobrist(self.n * self.n)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -30,54 +32,43 @@ class GobangGame(Game):
         if action == self.n * self.n:
             return (board, -player)
         b = Board(self.n)
-        b.pieces = np.copy(board)
+        b.pieces = np.copy(board).view(LastMoveBoard)
         move = (int(action / self.n), action % self.n)
         b.execute_move(move, player)
+        b.pieces.last_move = move
         return (b.pieces, -player)
 
     # modified
     def getValidMoves(self, board, player):
-        # return a fixed size binary vector
-        valids = [0] * self.getActionSize()
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        legalMoves = b.get_legal_moves(player)
-        if len(legalMoves) == 0:
-            valids[-1] = 1
-            return np.array(valids)
-        for x, y in legalMoves:
-            valids[self.n * x + y] = 1
-        return np.array(valids)
+        # return a fixed size binary vector: the empty squares, or only the pass if there is none
+        valids = np.zeros(self.getActionSize(), dtype=int)
+        valids[:-1] = np.asarray(board).ravel() == 0
+        valids[-1] = not valids.any()
+        return valids
 
     # modified
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
         b = Board(self.n)
-        b.pieces = np.copy(board)
-        n = self.n_in_row
-
-        for w in range(self.n):
-            for h in range(self.n):
-                if (w in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[i][h] for i in range(w, w + n))) == 1):
-                    return board[w][h]
-                if (h in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[w][j] for j in range(h, h + n))) == 1):
-                    return board[w][h]
-                if (w in range(self.n - n + 1) and h in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[w + k][h + k] for k in range(n))) == 1):
-                    return board[w][h]
-                if (w in range(self.n - n + 1) and h in range(n - 1, self.n) and board[w][h] != 0 and
-                        len(set(board[w + l][h - l] for l in range(n))) == 1):
-                    return board[w][h]
-        if b.has_legal_moves():
+        b.pieces = board
+        last_move = getattr(board, 'last_move', None)
+        if last_move is None:
+            winner = b.get_n_in_row(self.n_in_row)
+        else:
+            winner = b.get_n_in_row_through(last_move, self.n_in_row)
+        if winner != 0:
+            return winner
+        if np.any(board == 0):
             return 0
         return 1e-4
 
     def getCanonicalForm(self, board, player):
         # return state if player==1, else return -state if player==-1
-        return player * board
+        canonical = player * board
+        if isinstance(canonical, LastMoveBoard):
+            canonical.last_move = board.last_move
+        return canonical
 
     # modified
     def getSymmetries(self, board, pi):
@@ -10,6 +10,9 @@ Board data:
 Squares are stored and manipulated as (x,y) tuples.
 x is the column, y is the row.
 '''
+import numpy as np
+
+
 class Board():
     def __init__(self, n):
         "Set up initial board configuration."
@@ -54,3 +57,44 @@ class Board():
         assert self[x][y] == 0
         self[x][y] = color
 
+    def get_n_in_row(self, n_in_row):
+        """Returns the color of the first line of n_in_row pieces of one color,
+        or 0 if there is none. Lines are ordered by their first square, x then
+        y, and then by direction: along x, along y, diagonal, anti-diagonal.
+        All the windows of every direction are summed at once with shifted
+        slices; a window is a line when its sum is +-n_in_row.
+        """
+        b = np.asarray(self.pieces)
+        n, k = self.n, n_in_row
+        m = n - k + 1
+        if m <= 0:
+            return 0
+        starts = np.zeros((n, n, 4), dtype=bool)  # (x, y, direction) of the first piece of a line
+        starts[:m, :, 0] = np.abs(sum(b[i:i + m, :] for i in range(k))) == k
+        starts[:, :m, 1] = np.abs(sum(b[:, j:j + m] for j in range(k))) == k
+        starts[:m, :m, 2] = np.abs(sum(b[l:l + m, l:l + m] for l in range(k))) == k
+        starts[:m, k - 1:, 3] = np.abs(sum(b[l:l + m, k - 1 - l:n - l] for l in range(k))) == k
+        first = np.argmax(starts)
+        if not starts.flat[first]:
+            return 0
+        x, y = divmod(first // 4, n)
+        return b[x][y]
+
+    def get_n_in_row_through(self, move, n_in_row):
+        """Same as get_n_in_row for a board that had no line before the piece
+        at move was placed: only a line through that piece can exist, so only
+        the four lines through it are walked.
+        """
+        x, y = move
+        b = self.pieces
+        color = b[x][y]
+        for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            count = 1
+            for sign in (1, -1):
+                cur_x, cur_y = x + sign * dx, y + sign * dy
+                while count < n_in_row and 0 <= cur_x < self.n and 0 <= cur_y < self.n and b[cur_x][cur_y] == color:
+                    count += 1
+                    cur_x, cur_y = cur_x + sign * dx, cur_y + sign * dy
+            if count >= n_in_row:
+                return color
+        return 0
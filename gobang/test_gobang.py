@@ -0,0 +1,59 @@
+"""
+To run tests:
+pytest-3 gobang
+"""
+
+import numpy as np
+
+from .GobangGame import GobangGame
+
+
+def scanned_game_ended(board, n_in_row):
+    """getGameEnded as a loop over every square and direction, the reference for the vectorized check."""
+    n = len(board)
+    for w in range(n):
+        for h in range(n):
+            if (w in range(n - n_in_row + 1) and board[w][h] != 0 and
+                    len(set(board[i][h] for i in range(w, w + n_in_row))) == 1):
+                return board[w][h]
+            if (h in range(n - n_in_row + 1) and board[w][h] != 0 and
+                    len(set(board[w][j] for j in range(h, h + n_in_row))) == 1):
+                return board[w][h]
+            if (w in range(n - n_in_row + 1) and h in range(n - n_in_row + 1) and board[w][h] != 0 and
+                    len(set(board[w + k][h + k] for k in range(n_in_row))) == 1):
+                return board[w][h]
+            if (w in range(n - n_in_row + 1) and h in range(n_in_row - 1, n) and board[w][h] != 0 and
+                    len(set(board[w + l][h - l] for l in range(n_in_row))) == 1):
+                return board[w][h]
+    if np.any(board == 0):
+        return 0
+    return 1e-4
+
+
+def test_game_ended_matches_scan_on_random_boards():
+    """Arbitrary boards, with lines of both colors, go through the full vectorized check."""
+    rng = np.random.RandomState(0)
+    for n, n_in_row in ((6, 4), (9, 5), (15, 5)):
+        game = GobangGame(n, n_in_row)
+        for fill in (0.2, 0.6, 1.0):
+            for _ in range(30):
+                board = rng.choice([-1, 0, 1], size=(n, n), p=[fill / 2, 1 - fill, fill / 2])
+                assert scanned_game_ended(board, n_in_row) == game.getGameEnded(board, 1)
+
+
+def test_game_ended_matches_scan_in_random_games():
+    """Boards made by getNextState only check the lines through the last move."""
+    rng = np.random.RandomState(1)
+    for n, n_in_row in ((5, 4), (15, 5)):
+        game = GobangGame(n, n_in_row)
+        for _ in range(10):
+            board, player = game.getInitBoard(), 1
+            while True:
+                canonical = game.getCanonicalForm(board, player)
+                assert scanned_game_ended(np.array(canonical), n_in_row) == game.getGameEnded(canonical, 1)
+                ended = game.getGameEnded(board, player)
+                assert scanned_game_ended(np.array(board), n_in_row) == ended
+                if ended != 0:
+                    break
+                valids = game.getValidMoves(board, player)
+                board, player = game.getNextState(board, player, rng.choice(np.flatnonzero(valids)))
@@ -18,13 +18,34 @@ args = dotdict({
     'updateThreshold': 0.6,     # During arena playoff, new neural net will be accepted if threshold or more of games are won.
     'maxlenOfQueue': 200000,    # Number of game examples to train the neural networks.
     'numMCTSSims': 25,          # Number of games moves for MCTS to simulate.
+    'mctsTimeBudget': None,     # Optional wall-clock limit in seconds per move; the search stops at whichever limit comes first.
+    'earlyStop': False,         # With temp=0, stop the search once the remaining simulations cannot change the chosen move.
     'arenaCompare': 8,         # Number of games to play during arena play to determine if new net will be accepted.
     'cpuct': 1,
+    'reuseTree': True,          # Keep the subtree below each played move and free the rest of the search tree.
+    'arrayMCTS': False,         # Use the array-backed ArrayMCTS engine, required by mctsBatchSize below.
+    'mctsBatchSize': 1,         # Number of leaves evaluated per neural network call.
+    'symmetricSearch': False,   # Search one representative of every set of symmetric positions (see Game.getSymmetries).
+    'evalCacheSize': 0,         # Size of the LRU cache of network evaluations shared by all searches, 0 disables it.
+    'parallelGames': 1,         # Number of self-play games played side by side, sharing batched network calls.
+    'selfPlayWorkers': 0,       # Number of worker processes playing the self-play episodes, 0 plays them in this process.
+    'pipeline': False,          # Run self-play (in selfPlayWorkers processes), training and gating concurrently.
+    'seed': 0,                  # Base of the per-episode random seeds used by the self-play workers.
+    'arenaWorkers': 0,          # Number of worker processes playing the Arena games, 0 plays them in this process.
+    'sprt': False,              # Stop the arena as soon as a sequential probability ratio test accepts or rejects the new net.
+    'sprtElo0': 0,              # Elo gain of the new net under the null hypothesis of the SPRT (reject).
+    'sprtElo1': 70,             # Elo gain under the alternative hypothesis (accept), about a 0.6 score like updateThreshold.
+    'sprtAlpha': 0.05,          # SPRT probability of accepting a net that is not stronger.
+    'sprtBeta': 0.05,           # SPRT probability of rejecting a net that is stronger.
 
     'checkpoint': './temp/',
     'load_model': True,
     'load_folder_file': ('./temp','best.h5'),
     'numItersForTrainExamplesHistory': 20,
+    'saveExamples': False,      # Save the examples of every iteration to checkpoint/examples/, see ExampleStore.py.
+    'lazySymmetries': False,    # Store each move once and train on a random symmetry of it instead of storing all of them.
+    'numSymmetries': None,      # Store this many random symmetries of each move instead of all of them (None stores all).
+    'replayBufferSize': 0,      # Capacity of the memory-mapped replay buffer in checkpoint/replay/, 0 keeps the examples in memory.
 
 })
 
@@ -45,9 +66,9 @@ def main():
     log.info('Loading the Coach...')
     c = Coach(g, nnet, args)
 
-    #if args.load_model:
-        # log.info("Loading 'trainExamples' from file...") Not loading due to MemoryError
-        # c.loadTrainExamples()
+    if args.load_model and args.saveExamples:
+        log.info("Loading 'trainExamples' from file...")
+        c.loadTrainExamples()
 
     log.info('Starting the learning process 🎉')
     c.learn()
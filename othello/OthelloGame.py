@@ -2,7 +2,7 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
-from .OthelloLogic import Board
+from .OthelloLogic import Bitboard, Board
 import numpy as np
 
 class OthelloGame(Game):
@@ -16,8 +16,9 @@ class OthelloGame(Game):
     def getSquarePiece(piece):
         return OthelloGame.square_content[piece]
 
-    def __init__(self, n):
+    def __init__(self, n, bitboard=False):
         self.n = n
+        self.bitboard = bitboard  # play the moves with the Bitboard engine of OthelloLogic
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -37,6 +38,10 @@ class OthelloGame(Game):
         # action must be a valid move
         if action == self.n*self.n:
             return (board, -player)
+        if self.bitboard:
+            b = Bitboard.from_array(board)
+            b.execute_move(divmod(int(action), self.n), player)
+            return (b.to_array(board.dtype), -player)
         b = Board(self.n)
         b.pieces = np.copy(board)
         move = (int(action/self.n), action%self.n)
@@ -45,6 +50,13 @@ class OthelloGame(Game):
 
     def getValidMoves(self, board, player):
         # return a fixed size binary vector
+        if self.bitboard:
+            b = Bitboard.from_array(board)
+            moves = b.legal_mask(player)
+            valids = np.zeros(self.getActionSize(), dtype=int)
+            valids[:-1] = b.to_squares(moves)
+            valids[-1] = moves == 0
+            return valids
         valids = [0]*self.getActionSize()
         b = Board(self.n)
         b.pieces = np.copy(board)
@@ -59,8 +71,7 @@ class OthelloGame(Game):
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
-        b = Board(self.n)
-        b.pieces = np.copy(board)
+        b = self.getLogicBoard(board)
         if b.has_legal_moves(player):
             return 0
         if b.has_legal_moves(-player):
@@ -90,16 +101,22 @@ class OthelloGame(Game):
         return l
 
     def stringRepresentation(self, board):
-        return board.tostring()
+        return board.tobytes()
 
     def stringRepresentationReadable(self, board):
         board_s = "".join(self.square_content[square] for row in board for square in row)
         return board_s
 
     def getScore(self, board, player):
+        return self.getLogicBoard(board).countDiff(player)
+
+    def getLogicBoard(self, board):
+        # Bitboard or Board holding a copy of board
+        if self.bitboard:
+            return Bitboard.from_array(board)
         b = Board(self.n)
         b.pieces = np.copy(board)
-        return b.countDiff(player)
+        return b
 
     @staticmethod
     def display(board):
@@ -10,6 +10,11 @@ Board data:
 Squares are stored and manipulated as (x,y) tuples.
 x is the column, y is the row.
 '''
+from functools import lru_cache
+
+import numpy as np
+
+
 class Board():
 
     # list of all 8 directions on the board, as (x,y) offsets
@@ -163,3 +168,122 @@ class Board():
             move=list(map(sum,zip(move,direction)))
             #move = (move[0]+direction[0],move[1]+direction[1])
 
+
+COLORS = np.array([[1], [-1]])  # the colors of Bitboard.white and Bitboard.black
+
+
+@lru_cache(maxsize=None)
+def bitboard_shifts(n):
+    """
+    For each of the 8 directions of an n x n Bitboard, the left and right
+    shifts (one of them 0) that move every square one step that way and the
+    mask of the squares it can land on without wrapping from one edge to the
+    other.
+    """
+    full = (1 << (n * n)) - 1
+    first = sum(1 << (x * n) for x in range(n))  # squares with y == 0
+    last = first << (n - 1)  # squares with y == n - 1
+    shifts = []
+    for dx, dy in ((1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1)):
+        mask = full & ~(first if dy == 1 else last if dy == -1 else 0)
+        amount = dx * n + dy
+        shifts.append((max(amount, 0), max(-amount, 0), mask))
+    return full, tuple(shifts)
+
+
+class Bitboard():
+    """
+    Board with the same methods, where the squares of each color are the bits
+    of one integer, square (x,y) being bit x*n+y like the actions of
+    OthelloGame. Moves are generated and flipped with whole-board shifts in
+    the 8 directions instead of walking square by square. Python integers
+    have no fixed width, so the same code serves 8x8 (64 bits) and any other
+    size.
+    """
+
+    def __init__(self, n, white=0, black=0):
+        self.n = n
+        self.white = white
+        self.black = black
+        self.full, self.shifts = bitboard_shifts(n)
+
+    @classmethod
+    def from_array(cls, pieces):
+        pieces = np.asarray(pieces)
+        # both colors packed in one call, white in the first row
+        packed = np.packbits(pieces.reshape(1, -1) == COLORS, axis=1, bitorder='little')
+        return cls(len(pieces), int.from_bytes(packed[0].tobytes(), 'little'),
+                   int.from_bytes(packed[1].tobytes(), 'little'))
+
+    def to_squares(self, bits):
+        nbytes = (self.n * self.n + 7) // 8
+        return np.unpackbits(np.frombuffer(bits.to_bytes(nbytes, 'little'), dtype=np.uint8),
+                             count=self.n * self.n, bitorder='little')
+
+    def to_array(self, dtype=int):
+        # both colors unpacked in one call
+        nbytes = (self.n * self.n + 7) // 8
+        packed = self.white.to_bytes(nbytes, 'little') + self.black.to_bytes(nbytes, 'little')
+        squares = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), bitorder='little')
+        squares = squares.reshape(2, -1)[:, :self.n * self.n]
+        return (squares[0].astype(dtype) - squares[1]).reshape(self.n, self.n)
+
+    def own(self, color):
+        "Returns the bits of color and of its opponent."
+        return (self.white, self.black) if color == 1 else (self.black, self.white)
+
+    def countDiff(self, color):
+        """Counts the # pieces of the given color
+        (1 for white, -1 for black, 0 for empty spaces)"""
+        own, other = self.own(color)
+        return bin(own).count('1') - bin(other).count('1')
+
+    def legal_mask(self, color):
+        """Returns the bits of the legal moves for the given color."""
+        own, other = self.own(color)
+        empty = self.full & ~(own | other)
+        moves = 0
+        for left, right, mask in self.shifts:
+            # ends of the lines of opponent pieces that start next to own pieces
+            line = (own << left >> right) & mask & other
+            while line:
+                line = (line << left >> right) & mask
+                moves |= line & empty
+                line &= other
+        return moves
+
+    def get_legal_moves(self, color):
+        """Returns all the legal moves for the given color.
+        (1 for white, -1 for black
+        """
+        return [divmod(i, self.n) for i in np.flatnonzero(self.to_squares(self.legal_mask(color)))]
+
+    def has_legal_moves(self, color):
+        return self.legal_mask(color) != 0
+
+    def execute_move(self, move, color):
+        """Perform the given move on the board; flips pieces as necessary.
+        color gives the color pf the piece to play (1=white,-1=black)
+        """
+        x, y = move
+        square = 1 << (x * self.n + y)
+        own, other = self.own(color)
+        flips = 0
+        anchored = False
+        for left, right, mask in self.shifts:
+            line = 0
+            cur = (square << left >> right) & mask
+            while cur & other:
+                line |= cur
+                cur = (cur << left >> right) & mask
+            if cur & own:
+                # like Board, a piece of the same color next to the move anchors it without flips
+                flips |= line
+                anchored = True
+        assert anchored
+        own |= square | flips
+        other &= ~flips
+        if color == 1:
+            self.white, self.black = own, other
+        else:
+            self.black, self.white = own, other
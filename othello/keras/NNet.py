@@ -9,6 +9,7 @@ import sys
 sys.path.append('../..')
 from utils import *
 from NeuralNet import NeuralNet
+from BatchStream import BatchStream
 
 import argparse
 
@@ -33,11 +34,8 @@ class NNetWrapper(NeuralNet):
         """
         examples: list of examples, each example is of form (board, pi, v)
         """
-        input_boards, target_pis, target_vs = list(zip(*examples))
-        input_boards = np.asarray(input_boards)
-        target_pis = np.asarray(target_pis)
-        target_vs = np.asarray(target_vs)
-        self.nnet.model.fit(x = input_boards, y = [target_pis, target_vs], batch_size = args.batch_size, epochs = args.epochs)
+        batches = BatchStream(examples, args.batch_size, args.epochs, augment=self.augmentBatch)
+        self.nnet.model.fit(iter(batches), steps_per_epoch=len(batches), epochs=args.epochs)
 
     def predict(self, board):
         """
@@ -55,6 +53,17 @@ class NNetWrapper(NeuralNet):
         #print('PREDICTION TIME TAKEN : {0:03f}'.format(time.time()-start))
         return pi[0], v[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: list of np arrays with boards
+        """
+        # preparing input
+        boards = np.asarray(boards)
+
+        # run all boards in one call
+        pi, v = self.nnet.model.predict(boards, verbose=False)
+        return pi, v[:, 0]
+
     def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         # change extension
         filename = filename.split(".")[0] + ".h5"
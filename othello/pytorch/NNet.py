@@ -8,6 +8,7 @@ from tqdm import tqdm
 sys.path.append('../../')
 from utils import *
 from NeuralNet import NeuralNet
+from BatchStream import BatchStream, ExampleArrays
 
 import torch
 import torch.optim as optim
@@ -39,21 +40,26 @@ class NNetWrapper(NeuralNet):
         """
         optimizer = optim.Adam(self.nnet.parameters())
 
+        if not hasattr(examples, 'gather'):
+            examples = ExampleArrays(examples, np.float32)
+        # float32 batches are assembled by a background thread and shared with torch without a copy
+        batches = BatchStream(examples, args.batch_size, args.epochs, augment=self.augmentBatch, dtype=np.float32,
+                              replacement=True)
+        batch_count = len(batches)
+        batches = iter(batches)
+
         for epoch in range(args.epochs):
             print('EPOCH ::: ' + str(epoch + 1))
             self.nnet.train()
             pi_losses = AverageMeter()
             v_losses = AverageMeter()
 
-            batch_count = int(len(examples) / args.batch_size)
-
             t = tqdm(range(batch_count), desc='Training Net')
             for _ in t:
-                sample_ids = np.random.randint(len(examples), size=args.batch_size)
-                boards, pis, vs = list(zip(*[examples[i] for i in sample_ids]))
-                boards = torch.FloatTensor(np.array(boards).astype(np.float64))
-                target_pis = torch.FloatTensor(np.array(pis))
-                target_vs = torch.FloatTensor(np.array(vs).astype(np.float64))
+                boards, (target_pis, target_vs) = next(batches)
+                boards = torch.from_numpy(boards)
+                target_pis = torch.from_numpy(target_pis)
+                target_vs = torch.from_numpy(target_vs)
 
                 # predict
                 if args.cuda:
@@ -93,6 +99,20 @@ class NNetWrapper(NeuralNet):
         # print('PREDICTION TIME TAKEN : {0:03f}'.format(time.time()-start))
         return torch.exp(pi).data.cpu().numpy()[0], v.data.cpu().numpy()[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: list of np arrays with boards
+        """
+        # preparing input
+        boards = torch.FloatTensor(np.asarray(boards).astype(np.float64))
+        if args.cuda: boards = boards.contiguous().cuda()
+        boards = boards.view(-1, self.board_x, self.board_y)
+        self.nnet.eval()
+        with torch.no_grad():
+            pi, v = self.nnet(boards)
+
+        return torch.exp(pi).data.cpu().numpy(), v.data.cpu().numpy().reshape(-1)
+
     def loss_pi(self, targets, outputs):
         return -torch.sum(targets * outputs) / targets.size()[0]
 
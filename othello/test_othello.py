@@ -0,0 +1,55 @@
+"""
+To run tests:
+pytest-3 othello
+"""
+
+import numpy as np
+
+from .OthelloGame import OthelloGame
+from .OthelloLogic import Bitboard, Board
+
+
+def logic_board(np_pieces):
+    b = Board(len(np_pieces))
+    b.pieces = np.copy(np_pieces)
+    return b
+
+
+def test_bitboard_matches_board_in_random_games():
+    """Randomized differential test of OthelloGame with and without bitboard."""
+    rng = np.random.RandomState(0)
+    for n in (6, 8):
+        game, bitgame = OthelloGame(n), OthelloGame(n, bitboard=True)
+        for _ in range(10):
+            board, player = game.getInitBoard(), 1
+            while True:
+                valids = game.getValidMoves(board, player)
+                np.testing.assert_array_equal(valids, bitgame.getValidMoves(board, player))
+                for p in (1, -1):
+                    assert game.getGameEnded(board, p) == bitgame.getGameEnded(board, p)
+                    assert game.getScore(board, p) == bitgame.getScore(board, p)
+                if game.getGameEnded(board, player) != 0:
+                    break
+                action = rng.choice(np.flatnonzero(valids))
+                next_board, next_player = game.getNextState(board, player, action)
+                bit_board, bit_player = bitgame.getNextState(board, player, action)
+                np.testing.assert_array_equal(next_board, bit_board)
+                assert next_player == bit_player
+                board, player = next_board, next_player
+
+
+def test_bitboard_matches_board_on_random_positions():
+    """Legal moves and flips of every legal move on arbitrary boards, including odd sizes."""
+    rng = np.random.RandomState(1)
+    for n in (5, 7, 8, 10):
+        for _ in range(20):
+            np_pieces = rng.choice([-1, 0, 1], size=(n, n), p=[0.35, 0.3, 0.35])
+            for color in (1, -1):
+                board, bitboard = logic_board(np_pieces), Bitboard.from_array(np_pieces)
+                assert sorted(board.get_legal_moves(color)) == sorted(bitboard.get_legal_moves(color))
+                assert board.countDiff(color) == bitboard.countDiff(color)
+                for move in board.get_legal_moves(color):
+                    board, bitboard = logic_board(np_pieces), Bitboard.from_array(np_pieces)
+                    board.execute_move(move, color)
+                    bitboard.execute_move(move, color)
+                    np.testing.assert_array_equal(board.pieces, bitboard.to_array())
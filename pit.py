@@ -1,5 +1,5 @@
 import Arena
-from MCTS import MCTS
+from ArrayMCTS import ArrayMCTS
 from connect4.Connect4Game import Connect4Game
 from connect4.Connect4Players import *
 from connect4.keras.NNet import NNetWrapper as NNet
@@ -34,8 +34,8 @@ if mini_othello:
     n1.load_checkpoint('./temp/','best.h5')
 else:
     n1.load_checkpoint('./temp/','best.h5')
-args1 = dotdict({'numMCTSSims': 50, 'cpuct':1.0})
-mcts1 = MCTS(g, n1, args1)
+args1 = dotdict({'numMCTSSims': 50, 'cpuct':1.0, 'reuseTree': True})
+mcts1 = ArrayMCTS(g, n1, args1)
 n1p = lambda x: np.argmax(mcts1.getActionProb(x, temp=0))
 
 if human_vs_cpu:
@@ -43,8 +43,8 @@ if human_vs_cpu:
 else:
     n2 = NNet(g)
     n2.load_checkpoint('./temp/', 'best.h5')
-    args2 = dotdict({'numMCTSSims': 50, 'cpuct': 1.0})
-    mcts2 = MCTS(g, n2, args2)
+    args2 = dotdict({'numMCTSSims': 50, 'cpuct': 1.0, 'reuseTree': True})
+    mcts2 = ArrayMCTS(g, n2, args2)
     n2p = lambda x: np.argmax(mcts2.getActionProb(x, temp=0))
 
     player2 = n2p  # Player 2 is neural network if it's cpu vs cpu.
@@ -4,6 +4,7 @@ import sys
 import numpy as np
 
 sys.path.append('../..')
+from BatchStream import BatchStream
 from NeuralNet import NeuralNet
 from rts.keras.RTSNNet import RTSNNet
 from rts.src.config import VERBOSE_MODEL_FIT
@@ -43,17 +44,9 @@ class NNetWrapper(NeuralNet):
         """
         from rts.src.config_class import CONFIG
 
-        input_boards, target_pis, target_vs = list(zip(*examples))
-        input_boards = np.asarray(input_boards)
-        target_pis = np.asarray(target_pis)
-        target_vs = np.asarray(target_vs)
-
-        """
-        input_boards = CONFIG.nnet_args.encoder.encode_multiple(input_boards)
-        """
-        input_boards = self.encoder.encode_multiple(input_boards)
-
-        self.nnet.model.fit(x=input_boards, y=[target_pis, target_vs], batch_size=CONFIG.nnet_args.batch_size, epochs=CONFIG.nnet_args.epochs, verbose=VERBOSE_MODEL_FIT)
+        batches = BatchStream(examples, CONFIG.nnet_args.batch_size, CONFIG.nnet_args.epochs,
+                              augment=self.augmentBatch, transform=self.encoder.encode_multiple)
+        self.nnet.model.fit(iter(batches), steps_per_epoch=len(batches), epochs=CONFIG.nnet_args.epochs, verbose=VERBOSE_MODEL_FIT)
 
     def predict(self, board, player=None):
         """
@@ -72,6 +65,18 @@ class NNetWrapper(NeuralNet):
         pi, v = self.nnet.model.predict(board, verbose=False)
         return pi[0], v[0]
 
+    def predict_batch(self, boards):
+        """
+        Predicts actions for multiple boards with a single call to the model.
+        :param boards: list of boards
+        :return: array of predicted action vectors and array of win predictions (Pis, Vs)
+        """
+        boards = np.asarray([self.encoder.encode(board) for board in boards])
+
+        # run
+        pi, v = self.nnet.model.predict(boards, verbose=False)
+        return pi, v[:, 0]
+
     def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         # change extension
         filename = filename.split(".")[0] + ".h5"
@@ -9,6 +9,7 @@ import sys
 sys.path.append('../..')
 from utils import *
 from NeuralNet import NeuralNet
+from BatchStream import BatchStream
 
 import argparse
 from .TaflNNet import TaflNNet as onnet
@@ -32,11 +33,8 @@ class NNetWrapper(NeuralNet):
         """
         examples: list of examples, each example is of form (board, pi, v)
         """
-        input_boards, target_pis, target_vs = list(zip(*examples))
-        input_boards = np.asarray(input_boards)
-        target_pis = np.asarray(target_pis)
-        target_vs = np.asarray(target_vs)
-        self.nnet.model.fit(x = input_boards, y = [target_pis, target_vs], batch_size = args.batch_size, epochs = args.epochs)
+        batches = BatchStream(examples, args.batch_size, args.epochs, augment=self.augmentBatch)
+        self.nnet.model.fit(iter(batches), steps_per_epoch=len(batches), epochs=args.epochs)
 
     def predict(self, board):
         """
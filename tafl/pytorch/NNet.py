@@ -9,6 +9,7 @@ sys.path.append('../../')
 from utils import *
 
 from NeuralNet import NeuralNet
+from BatchStream import BatchStream, ExampleArrays
 
 import torch
 import torch.optim as optim
@@ -40,21 +41,26 @@ class NNetWrapper(NeuralNet):
         """
         optimizer = optim.Adam(self.nnet.parameters())
 
+        if not hasattr(examples, 'gather'):
+            examples = ExampleArrays(examples, np.float32)
+        # float32 batches are assembled by a background thread and shared with torch without a copy
+        batches = BatchStream(examples, args.batch_size, args.epochs, augment=self.augmentBatch, dtype=np.float32,
+                              replacement=True)
+        batch_count = len(batches)
+        batches = iter(batches)
+
         for epoch in range(args.epochs):
             print('EPOCH ::: ' + str(epoch + 1))
             self.nnet.train()
             pi_losses = AverageMeter()
             v_losses = AverageMeter()
 
-            batch_count = int(len(examples) / args.batch_size)
-
             t = tqdm(range(batch_count), desc='Training Net')
             for _ in t:
-                sample_ids = np.random.randint(len(examples), size=args.batch_size)
-                boards, pis, vs = list(zip(*[examples[i] for i in sample_ids]))
-                boards = torch.FloatTensor(np.array(boards).astype(np.float64))
-                target_pis = torch.FloatTensor(np.array(pis))
-                target_vs = torch.FloatTensor(np.array(vs).astype(np.float64))
+                boards, (target_pis, target_vs) = next(batches)
+                boards = torch.from_numpy(boards)
+                target_pis = torch.from_numpy(target_pis)
+                target_vs = torch.from_numpy(target_vs)
 
                 # predict
                 if args.cuda:
@@ -0,0 +1,91 @@
+"""
+Tests for Arena.py with simple deterministic players.
+"""
+
+import pickle
+import unittest
+
+import numpy as np
+
+from Arena import Arena, SPRT
+from Coach import MCTSPlayerFactory
+from test_mcts import HashNNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import *
+
+
+def firstValidPlayer(game):
+    return lambda board: int(np.flatnonzero(game.getValidMoves(board, 1))[0])
+
+
+def lastValidPlayer(game):
+    return lambda board: int(np.flatnonzero(game.getValidMoves(board, 1))[-1])
+
+
+def randomValidPlayer(game):
+    return lambda board: int(np.random.choice(np.flatnonzero(game.getValidMoves(board, 1))))
+
+
+class PlayerFactory():
+    def __init__(self, makePlayer, game):
+        self.makePlayer = makePlayer
+        self.game = game
+
+    def __call__(self):
+        return self.makePlayer(self.game)
+
+
+class TestArena(unittest.TestCase):
+
+    def test_parallel_games_match_serial_games(self):
+        game = TicTacToeGame()
+        expected = Arena(firstValidPlayer(game), lastValidPlayer(game), game).playGames(6)
+        arena = Arena(None, None, game, workers=2,
+                      playerFactories=(PlayerFactory(firstValidPlayer, game), PlayerFactory(lastValidPlayer, game)))
+        self.assertEqual(expected, arena.playGames(6))
+        self.assertEqual(6, sum(expected))
+
+    def test_parallel_games_follow_the_base_seed(self):
+        game = TicTacToeGame()
+        factory = PlayerFactory(randomValidPlayer, game)
+        arena = Arena(None, None, game, workers=2, playerFactories=(factory, factory))
+        results = [arena.playGames(40, seed=seed) for seed in (0, 0, 1)]
+        self.assertEqual(results[0], results[1])
+        self.assertNotEqual(results[0], results[2])
+
+    def test_mcts_player_factory_is_picklable(self):
+        game = TicTacToeGame()
+        args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0})
+        factory = pickle.loads(pickle.dumps(MCTSPlayerFactory(game, HashNNet, args, 'folder', 'file')))
+        arena = Arena(None, None, game, workers=2, playerFactories=(factory, factory))
+        oneWon, twoWon, draws = arena.playGames(4)
+        self.assertEqual(4, oneWon + twoWon + draws)
+
+    def test_sprt_decisions(self):
+        sprt = SPRT(elo0=0, elo1=70, alpha=0.05, beta=0.05)
+        self.assertIsNone(sprt.status(3, 2, 1))
+        self.assertEqual('accept', sprt.status(60, 20, 20))
+        self.assertEqual('reject', sprt.status(30, 40, 30))
+        self.assertEqual(0.0, sprt.llr(0, 0, 0))
+        self.assertLess(sprt.llr(0, 0, 10), 0)  # draws only are no gain
+
+    def test_sprt_decides_clean_sweeps(self):
+        sprt = SPRT()
+        self.assertEqual('accept', sprt.status(20, 0, 0))
+        self.assertEqual('reject', sprt.status(0, 20, 0))
+        self.assertEqual('reject', sprt.status(0, 0, 40))
+        self.assertIsNone(sprt.status(2, 0, 0))
+
+    def test_play_games_sprt_stops_early(self):
+        game = TicTacToeGame()
+        arena = Arena(firstValidPlayer(game), lastValidPlayer(game), game)
+        oneWon, twoWon, draws, status = arena.playGamesSPRT(1000, SPRT())
+        played = oneWon + twoWon + draws
+        self.assertEqual('reject', status)
+        self.assertLess(played, 1000)
+        self.assertEqual(0, played % 2)
+        self.assertEqual(status, SPRT().status(twoWon, oneWon, draws))
+
+
+if __name__ == '__main__':
+    unittest.main()
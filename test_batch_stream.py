@@ -0,0 +1,91 @@
+"""
+Tests for the prefetching mini-batch stream in BatchStream.py.
+"""
+
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from BatchStream import BatchStream, ExampleArrays
+from ReplayBuffer import ReplayBuffer
+
+
+def example(i):
+    return np.full((3, 3), i, dtype=np.int64), np.full(10, i / 10.0), float(i)
+
+
+class TestBatchStream(unittest.TestCase):
+
+    def test_every_example_once_per_epoch(self):
+        examples = [example(i) for i in range(10)]
+        batches = BatchStream(examples, 4, epochs=3)
+        self.assertEqual(3, len(batches))
+        items = list(batches)
+        self.assertEqual(9, len(items))
+        self.assertEqual([4, 4, 2] * 3, [len(boards) for boards, _ in items])
+        for epoch in range(3):
+            vs = np.concatenate([vs for _, (_, vs) in items[3 * epoch:3 * epoch + 3]])
+            self.assertEqual(list(range(10)), sorted(vs))
+        for boards, (pis, vs) in items:
+            np.testing.assert_array_equal(boards[:, 0, 0], vs)
+            np.testing.assert_allclose(pis[:, 0], vs / 10.0)
+
+    def test_gathers_from_replay_buffer(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(folder, 6)
+            buffer.addIteration([example(i) for i in range(9)])
+            self.assertEqual(5.0, buffer[2][2])
+            boards, (pis, vs) = next(iter(BatchStream(buffer, 6, epochs=1, transform=lambda b: b * 2)))
+            self.assertEqual(list(range(3, 9)), sorted(vs))
+            np.testing.assert_array_equal(boards[:, 0, 0], 2 * vs)
+
+    def test_sampled_float32_batches(self):
+        arrays = ExampleArrays([example(i) for i in range(10)])
+        self.assertEqual(np.float32, arrays.boards.dtype)
+        batches = BatchStream(arrays, 4, epochs=2, dtype=np.float32, replacement=True)
+        self.assertEqual(2, len(batches))
+        items = list(batches)
+        self.assertEqual(4, len(items))
+        for boards, (pis, vs) in items:
+            self.assertEqual((4, 3, 3), boards.shape)
+            self.assertEqual([np.float32] * 3, [boards.dtype, pis.dtype, vs.dtype])
+            np.testing.assert_array_equal(boards[:, 0, 0], vs)
+            np.testing.assert_allclose(pis[:, 0], vs / 10.0, rtol=1e-6)
+
+    def test_stops_producer_when_abandoned(self):
+        examples = [example(i) for i in range(100)]
+        stream = iter(BatchStream(examples, 1, epochs=10, prefetch=2))
+        threads = threading.active_count()
+        next(stream)
+        stream.close()  # the producer would block on the full queue otherwise
+        deadline = time.time() + 5
+        while threading.active_count() > threads and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(threads, threading.active_count())
+
+    def test_stops_producer_blocked_on_its_last_item(self):
+        # one batch per epoch: the producer is putting the end marker on a full queue
+        examples = [example(i) for i in range(4)]
+        threads = threading.active_count()
+        stream = iter(BatchStream(examples, 4, epochs=2, prefetch=1))
+        next(stream)
+        time.sleep(0.3)
+        stream.close()
+        deadline = time.time() + 5
+        while threading.active_count() > threads and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(threads, threading.active_count())
+
+    def test_raises_producer_errors(self):
+        def augment(boards, pis):
+            raise RuntimeError('bad batch')
+
+        with self.assertRaises(RuntimeError):
+            list(BatchStream([example(i) for i in range(4)], 2, epochs=1, augment=augment))
+
+
+if __name__ == '__main__':
+    unittest.main()
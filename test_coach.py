@@ -0,0 +1,195 @@
+"""
+Tests for the self-play drivers in Coach.py, using the stand-in network of
+test_mcts.py.
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import Coach as coach_module
+from Coach import Coach
+from test_mcts import CountingNNet, HashNNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import *
+
+
+class CrashingNNet(HashNNet):
+    """
+    Kills the worker process on its first prediction while the file crash
+    exists in the folder its checkpoint was loaded from.
+    """
+    crash_file = None
+
+    def load_checkpoint(self, folder, filename):
+        self.crash_file = os.path.join(folder, 'crash')
+
+    def predict(self, board):
+        if self.crash_file and os.path.exists(self.crash_file):
+            os.remove(self.crash_file)
+            os._exit(1)
+        return super().predict(board)
+
+
+def crashingGate(*args):
+    os._exit(1)
+
+
+class TestCoach(unittest.TestCase):
+
+    @staticmethod
+    def make_coach(**kwargs):
+        game = TicTacToeGame()
+        args = dotdict({'numMCTSSims': 25, 'cpuct': 1.0, 'tempThreshold': 4, 'arrayMCTS': True})
+        args.update(kwargs)
+        return Coach(game, HashNNet(game), args)
+
+    @staticmethod
+    def as_set(examples):
+        return set((board.tobytes(), np.asarray(pi, dtype=np.float64).tobytes(), float(v)) for board, pi, v in examples)
+
+    def test_execute_episodes_matches_single_episode(self):
+        coach = self.make_coach()
+        np.random.seed(1)
+        expected = coach.executeEpisode()
+        np.random.seed(1)
+        actual = coach.executeEpisodes(1)
+        self.assertEqual(len(expected), len(actual))
+        for (b1, p1, v1), (b2, p2, v2) in zip(expected, actual):
+            np.testing.assert_array_equal(b1, b2)
+            np.testing.assert_allclose(p1, p2)
+            self.assertEqual(v1, v2)
+
+    def test_execute_episodes_batches_all_games(self):
+        coach = self.make_coach()
+        np.random.seed(2)
+        examples = coach.executeEpisodes(4)
+        self.assertEqual(4, coach.nnet.batch_sizes[0])
+        self.assertTrue(all(size <= 4 for size in coach.nnet.batch_sizes))
+        # every game ends after at least 5 moves with 8 symmetries per move
+        self.assertGreaterEqual(len(examples), 4 * 5 * 8)
+        for board, pi, v in examples:
+            self.assertEqual((3, 3), board.shape)
+            self.assertAlmostEqual(1.0, sum(pi))
+            self.assertIn(v, (-1, 1, 1e-4, -1e-4))
+
+    def test_lazy_symmetries(self):
+        eager = self.make_coach()
+        np.random.seed(3)
+        expected = eager.executeEpisode()
+        lazy = self.make_coach(lazySymmetries=True)
+        np.random.seed(3)
+        examples = lazy.executeEpisode()
+        self.assertEqual(len(expected), 8 * len(examples))
+        self.assertIs(lazy.game, lazy.nnet.symmetryGame)
+
+        boards, pis, vs = zip(*examples)
+        np.random.seed(4)
+        augmented = lazy.nnet.augmentBatch(boards, pis)
+        self.assertEqual(len(examples), len(augmented[0]))
+        stored = self.as_set(expected)
+        self.assertTrue(all(x in stored for x in self.as_set(zip(*augmented, vs))))
+        # tictactoe symmetries only move cells, so the batch is permuted in one go
+        self.assertEqual(8, len(lazy.nnet.symmetryPermutations(boards[0], pis[0])[0]))
+
+    def test_sampled_symmetries(self):
+        coach = self.make_coach(numSymmetries=3)
+        np.random.seed(3)
+        examples = coach.executeEpisode()
+        self.assertEqual(0, len(examples) % 3)
+        board, pi = np.zeros((3, 3)), np.arange(10) / 45
+        board[0, 1] = 1
+        sampled = coach.game.sampleSymmetries(board, pi, 3)
+        self.assertEqual(3, len(sampled))
+        symmetries = self.as_set((b, p, 0) for b, p in coach.game.getSymmetries(board, pi))
+        self.assertTrue(self.as_set((b, p, 0) for b, p in sampled) <= symmetries)
+
+    def test_self_play_in_workers_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as folder:
+            coach = self.make_coach(numEps=4, selfPlayWorkers=2, checkpoint=folder)
+            first = list(coach.selfPlayInWorkers(1))
+            second = list(coach.selfPlayInWorkers(1))
+            self.assertEqual(self.as_set(first), self.as_set(second))
+
+            # the same seed played in this process gives the same examples
+            np.random.seed(coach.episodeSeed(1, 0))
+            coach.mcts = coach.mctsClass(coach.game, coach.nnet, coach.args)
+            self.assertLessEqual(self.as_set(coach.executeEpisode()), self.as_set(first))
+
+    def test_self_play_in_workers_survives_crash(self):
+        with tempfile.TemporaryDirectory() as folder:
+            game = TicTacToeGame()
+            args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0, 'tempThreshold': 4, 'numEps': 3,
+                            'selfPlayWorkers': 2, 'checkpoint': folder})
+            open(os.path.join(folder, 'crash'), 'w').close()
+            coach = Coach(game, CrashingNNet(game), args)
+            examples = list(coach.selfPlayInWorkers(1))
+            self.assertFalse(os.path.exists(os.path.join(folder, 'crash')))
+            expected = self.make_coach(numEps=3, selfPlayWorkers=2, checkpoint=folder, numMCTSSims=10,
+                                       arrayMCTS=False)
+            self.assertEqual(self.as_set(expected.selfPlayInWorkers(1)), self.as_set(examples))
+
+    def test_self_play_workers_leave_the_replay_buffer_alone(self):
+        with tempfile.TemporaryDirectory() as folder:
+            game = TicTacToeGame()
+            args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0, 'checkpoint': folder, 'replayBufferSize': 100})
+            coach_module.initSelfPlayWorker(game, HashNNet, args, folder, 'best.pth.tar')
+            self.assertIsNone(coach_module._workerCoach.replayBuffer)
+            self.assertEqual(100, args.replayBufferSize)
+
+    def test_learn_pipelined(self):
+        with tempfile.TemporaryDirectory() as folder:
+            game = TicTacToeGame()
+            args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0, 'tempThreshold': 4, 'numIters': 3, 'numEps': 2,
+                            'maxlenOfQueue': 10000, 'numItersForTrainExamplesHistory': 2, 'arenaCompare': 2,
+                            'updateThreshold': 0.6, 'selfPlayWorkers': 2, 'checkpoint': folder, 'pipeline': True})
+            coach = Coach(game, CountingNNet(game), args)
+            gated = self.record_gating(coach)
+            coach.learn()
+            stats = coach.pipelineStats
+            self.assertEqual(3, stats.iteration)
+            self.assertEqual(3, coach.nnet.trained)
+            self.assertGreaterEqual(stats.episodes, 6)
+            self.assertGreater(stats.episodesPerHour, 0)
+            self.assertLessEqual(stats.accepted, 3)
+            self.assertGreaterEqual(stats.maxPolicyLag, 0)
+            self.assertEqual(2, len(coach.trainExamplesHistory))
+            self.assertEqual(3, gated[-1][0])  # the last network is gated after the last iteration
+
+    def test_learn_pipelined_survives_gating_crashes(self):
+        with tempfile.TemporaryDirectory() as folder:
+            game = TicTacToeGame()
+            args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0, 'tempThreshold': 4, 'numIters': 3, 'numEps': 2,
+                            'maxlenOfQueue': 10000, 'numItersForTrainExamplesHistory': 2, 'arenaCompare': 2,
+                            'updateThreshold': 0.6, 'selfPlayWorkers': 1, 'checkpoint': folder, 'pipeline': True})
+            coach = Coach(game, CountingNNet(game), args)
+            gated = self.record_gating(coach)
+            gateCandidate = coach_module.gateCandidate
+            coach_module.gateCandidate = crashingGate
+            try:
+                coach.learn()
+            finally:
+                coach_module.gateCandidate = gateCandidate
+            self.assertEqual(3, coach.pipelineStats.iteration)
+            self.assertEqual(0, coach.pipelineStats.accepted)
+            self.assertEqual(3, gated[-1][0])
+            self.assertFalse(any(accepted for _, accepted in gated))
+
+    @staticmethod
+    def record_gating(coach):
+        """Returns the list the (iteration, accepted) of every gating of coach is appended to."""
+        gated = []
+        gatingResult = coach.gatingResult
+
+        def record(future, iteration):
+            accepted = gatingResult(future, iteration)
+            gated.append((iteration, accepted))
+            return accepted
+        coach.gatingResult = record
+        return gated
+
+
+if __name__ == '__main__':
+    unittest.main()
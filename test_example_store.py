@@ -0,0 +1,63 @@
+"""
+Tests for the compressed example store in ExampleStore.py.
+"""
+
+import os
+import tempfile
+import unittest
+from collections import deque
+from pickle import Pickler
+
+import numpy as np
+
+from ExampleStore import ExampleStore, convert
+
+
+def examples(n, actions=10, dense=False, seed=0):
+    rng = np.random.RandomState(seed)
+    result = []
+    for _ in range(n):
+        board = rng.randint(-1, 2, size=(4, 4))
+        pi = rng.random_sample(actions) if dense else np.eye(actions)[rng.randint(actions)] * 0.5
+        result.append((board, list(pi / np.sum(pi)), rng.choice([-1, 1])))
+    return result
+
+
+class TestExampleStore(unittest.TestCase):
+
+    def assert_same_examples(self, expected, actual):
+        self.assertEqual(len(expected), len(actual))
+        for (b1, p1, v1), (b2, p2, v2) in zip(expected, actual):
+            np.testing.assert_array_equal(b1, b2)
+            self.assertEqual(np.asarray(b1).dtype, b2.dtype)
+            np.testing.assert_allclose(p1, p2, atol=1e-3)
+            self.assertEqual(v1, v2)
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            store = ExampleStore(folder)
+            sparse, dense = examples(50), examples(50, dense=True, seed=1)
+            store.save(3, sparse)
+            store.save(1, dense)
+            self.assertEqual([1, 3], store.iterations())
+            self.assert_same_examples(sparse, store.load(3))
+            self.assert_same_examples(dense, store.load(1))
+            history = store.loadHistory([3])
+            self.assert_same_examples(sparse, list(next(history)))
+
+    def test_convert_pickled_history(self):
+        with tempfile.TemporaryDirectory() as folder:
+            history = [deque(examples(100, seed=i)) for i in range(3)]
+            examplesFile = os.path.join(folder, 'checkpoint_7.pth.tar.examples')
+            with open(examplesFile, 'wb') as f:
+                Pickler(f).dump(history)
+            count, before, after = convert(examplesFile, os.path.join(folder, 'examples'))
+            self.assertEqual(300, count)
+            self.assertLess(after, before)
+            store = ExampleStore(os.path.join(folder, 'examples'))
+            self.assertEqual([5, 6, 7], store.iterations())
+            self.assert_same_examples(history[2], store.load(7))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,337 @@
+"""
+Tests for the search engines in MCTS.py and ArrayMCTS.py. A deterministic
+stand-in network is used, so these run without Keras or PyTorch installed.
+"""
+
+import math
+import time
+import unittest
+import zlib
+
+import numpy as np
+
+from ArrayMCTS import ArrayMCTS
+from CachedNNet import CachedNNet
+from MCTS import MCTS, EPS
+from NeuralNet import NeuralNet
+from connect4.Connect4Game import Connect4Game
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+from tictactoe_3d.TicTacToeGame import TicTacToeGame as TicTacToe3DGame
+from utils import *
+
+
+class HashNNet(NeuralNet):
+    """Policy and value are a pure function of the board bytes."""
+
+    def __init__(self, game):
+        self.action_size = game.getActionSize()
+        self.batch_sizes = []
+
+    def predict_batch(self, boards):
+        self.batch_sizes.append(len(boards))
+        return NeuralNet.predict_batch(self, boards)
+
+    def predict(self, board):
+        rng = np.random.RandomState(zlib.crc32(np.ascontiguousarray(board).tobytes()))
+        pi = rng.random_sample(self.action_size)
+        return pi / np.sum(pi), rng.uniform(-1, 1)
+
+
+class RecursiveMCTS(MCTS):
+    def search(self, canonicalBoard):
+        return self.searchRecursive(canonicalBoard)
+
+
+class TestMCTS(unittest.TestCase):
+
+    @staticmethod
+    def counts_after_search(engine, game, args, moves=()):
+        board, player = game.getInitBoard(), 1
+        for a in moves:
+            board, player = game.getNextState(board, player, a)
+        mcts = engine(game, HashNNet(game), args)
+        board = game.getCanonicalForm(board, player)
+        mcts.getActionProb(board, temp=1)
+        return mcts.getCounts(board)
+
+    def assert_same_counts(self, game, moves=(), sims=100):
+        args = dotdict({'numMCTSSims': sims, 'cpuct': 1.0})
+        expected = self.counts_after_search(MCTS, game, args, moves)
+        actual = self.counts_after_search(ArrayMCTS, game, args, moves)
+        self.assertEqual(sims - 1, sum(expected))  # the first simulation expands the root
+        self.assertEqual(expected, actual)
+
+    def test_array_mcts_matches_tictactoe(self):
+        self.assert_same_counts(TicTacToeGame(), sims=200)
+        self.assert_same_counts(TicTacToeGame(), moves=(4, 0, 8), sims=200)
+
+    def test_array_mcts_matches_othello(self):
+        self.assert_same_counts(OthelloGame(6))
+
+    def test_array_mcts_matches_connect4(self):
+        self.assert_same_counts(Connect4Game(), moves=(60, 61, 50))
+
+    def test_iterative_search_matches_recursive(self):
+        game = Connect4Game()
+        args = dotdict({'numMCTSSims': 30, 'cpuct': 1.0})
+        history = []
+        for engine in (RecursiveMCTS, MCTS):
+            np.random.seed(1)
+            mcts = engine(game, HashNNet(game), args)
+            board, player, counts = game.getInitBoard(), 1, []
+            for _ in range(10):
+                canonical = game.getCanonicalForm(board, player)
+                pi = mcts.getActionProb(canonical, temp=1)
+                counts.append(mcts.getCounts(canonical))
+                board, player = game.getNextState(board, player, np.random.choice(len(pi), p=pi))
+            history.append(counts)
+        self.assertEqual(history[0], history[1])
+
+    def test_incremental_hash_keys_match_full_keys(self):
+        rng = np.random.RandomState(0)
+        for game in (Connect4Game(), GobangGame(7), TicTacToeGame(), TicTacToe3DGame(3)):
+            for _ in range(5):
+                board, player = game.getInitBoard(), 1
+                key = game.hashKey(board)
+                while game.getGameEnded(board, player) == 0:
+                    action = rng.choice(np.flatnonzero(game.getValidMoves(board, player)))
+                    key = game.getNextHashKey(key, board, player, action)
+                    board, player = game.getNextState(board, player, action)
+                    self.assertEqual(game.hashKey(board), key)
+                    self.assertEqual(game.hashKey(game.getCanonicalForm(board, player)),
+                                     game.getCanonicalHashKey(key, player))
+
+    def test_color_swaps_span_every_key_bit(self):
+        # swapping the color of a set of cells XORs the key with the color
+        # differences of those cells; they must span all 64 bits of the hash
+        # or boards with the same occupied cells collide far more often
+        zobrist = ZobristHash((11, 11))
+        basis = []
+        for white, black in zip(zobrist.keys[1], zobrist.keys[-1]):
+            diff = (white ^ black) & 0xFFFFFFFFFFFFFFFF
+            for b in basis:
+                diff = min(diff, diff ^ b)
+            if diff:
+                basis.append(diff)
+        self.assertEqual(64, len(basis))
+
+        board = np.random.RandomState(0).randint(-1, 2, size=(11, 11))
+        self.assertEqual(zobrist.hash(-board), zobrist.negate(zobrist.hash(board)))
+
+    def test_select_action_matches_loop(self):
+        rng = np.random.RandomState(0)
+        args = dotdict({'cpuct': 1.0})
+        for _ in range(200):
+            size = rng.randint(2, 30)
+            mcts = MCTS(TicTacToeGame(), None, args)
+            # coarse values so that ties between actions are common
+            mcts.Ps['s'] = rng.randint(0, 3, size) / 4.0
+            mcts.Vs['s'] = rng.randint(0, 2, size)
+            mcts.Vs['s'][rng.randint(size)] = 1
+            mcts.Nsa['s'] = np.where(rng.random_sample(size) < 0.5, rng.randint(1, 4, size), 0)
+            mcts.Qsa['s'] = np.where(mcts.Nsa['s'] > 0, rng.randint(-2, 3, size) / 2.0, 0.0)
+            mcts.Ns['s'] = int(mcts.Nsa['s'].sum())
+
+            best, best_a = -float('inf'), -1
+            for a in range(size):
+                if mcts.Vs['s'][a]:
+                    if mcts.Nsa['s'][a] > 0:
+                        u = mcts.Qsa['s'][a] + mcts.Ps['s'][a] * math.sqrt(mcts.Ns['s']) / (1 + mcts.Nsa['s'][a])
+                    else:
+                        u = mcts.Ps['s'][a] * math.sqrt(mcts.Ns['s'] + EPS)
+                    if u > best:
+                        best, best_a = u, a
+            self.assertEqual(best_a, mcts.selectAction('s'))
+
+    def test_batched_search(self):
+        game = Connect4Game()
+        nnet = HashNNet(game)
+        args = dotdict({'numMCTSSims': 200, 'cpuct': 1.0, 'mctsBatchSize': 8, 'virtualLoss': 1.0})
+        mcts = ArrayMCTS(game, nnet, args)
+        board = game.getInitBoard()
+        probs = mcts.getActionProb(board, temp=1)
+        self.assertAlmostEqual(1.0, sum(probs))
+        self.assertEqual(8, max(nnet.batch_sizes))
+        # every simulation but the ones that expanded the root left one visit
+        root = mcts.getNode(board)
+        self.assertEqual(root.Ns, sum(mcts.getCounts(board)))
+        self.assertEqual(200 - 1, root.Ns)
+        # virtual losses are all replaced by real values
+        for node in mcts.nodes.values():
+            if node.N is not None:
+                self.assertTrue(np.all(node.N >= 0))
+                visited = node.N > 0
+                np.testing.assert_allclose(node.Q[visited], node.W[visited] / node.N[visited])
+                self.assertTrue(np.all(np.abs(node.Q) <= 1 + 1e-9))
+
+    def test_reuse_tree_frees_unreachable_nodes(self):
+        game = OthelloGame(6)
+        args = dotdict({'numMCTSSims': 50, 'cpuct': 1.0, 'reuseTree': True})
+        mcts = ArrayMCTS(game, HashNNet(game), args)
+        board, player = game.getInitBoard(), 1
+        for _ in range(6):
+            canonical = game.getCanonicalForm(board, player)
+            action = int(np.argmax(mcts.getActionProb(canonical, temp=0)))
+            child = mcts.getNode(canonical).children[action]
+            visits, before = child.Ns, len(mcts.nodes)
+            board, player = game.getNextState(board, player, action)
+
+            # the played child becomes the root and keeps its statistics
+            freed = mcts.reroot(game.getCanonicalForm(board, player))
+            self.assertIs(child, mcts.getNode(game.getCanonicalForm(board, player)))
+            self.assertEqual(visits, child.Ns)
+            self.assertGreater(freed, 0)
+            self.assertEqual(before - freed, len(mcts.nodes))
+            self.assertNotIn(game.hashKey(canonical), mcts.nodes)
+
+    def test_reuse_tree_frees_unreachable_states(self):
+        game = OthelloGame(6)
+        args = dotdict({'numMCTSSims': 50, 'cpuct': 1.0, 'reuseTree': True})
+        mcts = MCTS(game, HashNNet(game), args)
+        board, player = game.getInitBoard(), 1
+        for _ in range(6):
+            canonical = game.getCanonicalForm(board, player)
+            action = int(np.argmax(mcts.getActionProb(canonical, temp=0)))
+            board, player = game.getNextState(board, player, action)
+            child = game.hashKey(game.getCanonicalForm(board, player))
+            visits, before = mcts.Ns[child], len(mcts.Es)
+
+            freed = mcts.reroot(game.getCanonicalForm(board, player))
+            self.assertEqual(visits, mcts.Ns[child])
+            self.assertGreater(freed, 0)
+            self.assertEqual(before - freed, len(mcts.Es))
+            self.assertNotIn(game.hashKey(canonical), mcts.Es)
+            self.assertEqual(set(mcts.Es), set(mcts.Ns) | {s for s in mcts.Es if mcts.Es[s] != 0})
+
+    def test_symmetric_search_shares_symmetric_states(self):
+        game = OthelloGame(6)
+        args = dotdict({'numMCTSSims': 100, 'cpuct': 1.0, 'symmetricSearch': True})
+        # the four opening moves of Othello lead to symmetric positions
+        mcts = ArrayMCTS(game, HashNNet(game), args)
+        mcts.getActionProb(game.getInitBoard(), temp=1)
+        root = mcts.getNode(game.getInitBoard())
+        self.assertEqual(4, len(root.children))
+        self.assertEqual(1, len({id(child) for child in root.children.values()}))
+
+        # a position that is not its own representative, so counts have to be mapped back
+        board = game.getCanonicalForm(game.getNextState(game.getInitBoard(), 1, 13)[0], -1)
+        for engine in (MCTS, ArrayMCTS):
+            mcts = engine(game, HashNNet(game), args)
+            self.assertNotEqual(game.hashKey(board), mcts.representative(board, game.hashKey(board))[0])
+            probs = mcts.getActionProb(board, temp=1)
+            self.assertAlmostEqual(1.0, sum(probs))
+            # probabilities are mapped back onto the moves of the board that was passed in
+            valids = game.getValidMoves(board, 1)
+            self.assertEqual(0, sum(p for p, valid in zip(probs, valids) if not valid))
+            self.assertEqual(99, sum(mcts.getCounts(board)))
+
+    def test_time_budget_stops_search(self):
+        game = TicTacToeGame()
+        nnet = CountingNNet(game, delay=0.01)
+        for engine in (MCTS, ArrayMCTS):
+            mcts = engine(game, nnet, dotdict({'numMCTSSims': 10000, 'cpuct': 1.0}))
+            probs = mcts.getActionProb(game.getInitBoard(), temp=1, timeBudget=0.1)
+            self.assertAlmostEqual(1.0, sum(probs))
+            self.assertTrue(mcts.searchStats.timedOut)
+            self.assertLess(mcts.searchStats.simulations, 10000)
+            self.assertLess(mcts.searchStats.seconds, 0.5)
+
+            mcts = engine(game, nnet, dotdict({'numMCTSSims': 20, 'cpuct': 1.0, 'mctsTimeBudget': 60}))
+            mcts.getActionProb(game.getInitBoard(), temp=1)
+            self.assertFalse(mcts.searchStats.timedOut)
+            self.assertEqual(20, mcts.searchStats.simulations)
+
+    def test_early_stop_keeps_chosen_move(self):
+        game = Connect4Game()
+        board = game.getInitBoard()
+        for engine in (MCTS, ArrayMCTS):
+            full = engine(game, HashNNet(game), dotdict({'numMCTSSims': 200, 'cpuct': 1.0}))
+            full.getActionProb(board, temp=0)
+            expected = full.getCounts(board)
+            stopped = engine(game, HashNNet(game), dotdict({'numMCTSSims': 200, 'cpuct': 1.0, 'earlyStop': True}))
+            probs = stopped.getActionProb(board, temp=0)
+            self.assertEqual(int(np.argmax(expected)), int(np.argmax(probs)))
+            self.assertGreater(stopped.searchStats.skipped, 0)
+            self.assertEqual(200, stopped.searchStats.simulations + stopped.searchStats.skipped)
+            counts = np.sort(stopped.getCounts(board))
+            self.assertGreater(counts[-1] - counts[-2], stopped.searchStats.skipped)
+
+            # temp=1 needs the full distribution, so the search is not cut short
+            stopped.getActionProb(board, temp=1)
+            self.assertEqual(0, stopped.searchStats.skipped)
+
+    def test_array_mcts_probs_are_distribution(self):
+        game = TicTacToeGame()
+        mcts = ArrayMCTS(game, HashNNet(game), dotdict({'numMCTSSims': 50, 'cpuct': 1.0}))
+        board = game.getInitBoard()
+        probs = mcts.getActionProb(board, temp=1)
+        self.assertAlmostEqual(1.0, sum(probs))
+        best = mcts.getActionProb(board, temp=0)
+        self.assertEqual(1, sum(best))
+
+
+
+class CountingNNet(HashNNet):
+    def __init__(self, game, delay=0):
+        super().__init__(game)
+        self.delay = delay
+        self.calls = 0
+        self.trained = 0
+
+    def predict(self, board):
+        self.calls += 1
+        time.sleep(self.delay)
+        return super().predict(board)
+
+    def train(self, examples):
+        self.trained += 1
+
+
+class TestCachedNNet(unittest.TestCase):
+
+    def test_cache_is_shared_between_searches(self):
+        game = TicTacToeGame()
+        nnet = CachedNNet(CountingNNet(game), game, 1000)
+        args = dotdict({'numMCTSSims': 50, 'cpuct': 1.0})
+        board = game.getInitBoard()
+        first = MCTS(game, nnet, args).getActionProb(board, temp=1)
+        calls = nnet.nnet.calls
+        second = MCTS(game, nnet, args).getActionProb(board, temp=1)
+        self.assertEqual(first, second)
+        self.assertEqual(calls, nnet.nnet.calls)
+        self.assertAlmostEqual(0.5, nnet.hitRate())
+
+    def test_lru_eviction_and_invalidation(self):
+        game = TicTacToeGame()
+        nnet = CachedNNet(CountingNNet(game), game, 2)
+        boards = [game.getNextState(game.getInitBoard(), 1, a)[0] for a in range(3)]
+        for board in boards:
+            nnet.predict(board)
+        nnet.predict(boards[2])
+        self.assertEqual(3, nnet.nnet.calls)
+        nnet.predict(boards[0])  # evicted as least recently used
+        self.assertEqual(4, nnet.nnet.calls)
+
+        nnet.train([])
+        self.assertEqual(1, nnet.nnet.trained)
+        self.assertEqual(0, len(nnet.cache))
+        nnet.predict(boards[0])
+        self.assertEqual(5, nnet.nnet.calls)
+
+    def test_predict_batch_only_evaluates_misses(self):
+        game = TicTacToeGame()
+        nnet = CachedNNet(CountingNNet(game), game, 100)
+        boards = [game.getNextState(game.getInitBoard(), 1, a)[0] for a in range(4)]
+        nnet.predict(boards[1])
+        pis, vs = nnet.predict_batch(boards)
+        self.assertEqual(4, nnet.nnet.calls)
+        for board, pi, v in zip(boards, pis, vs):
+            expected_pi, expected_v = HashNNet(game).predict(board)
+            np.testing.assert_allclose(expected_pi, pi)
+            self.assertAlmostEqual(expected_v, v)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for the memory-mapped replay buffer in ReplayBuffer.py.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from ReplayBuffer import ReplayBuffer
+
+
+def example(i):
+    return np.full((3, 3), i, dtype=np.int64), np.full(10, i / 10.0), float(i)
+
+
+class TestReplayBuffer(unittest.TestCase):
+
+    def test_ring_overwrites_oldest(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(folder, 5)
+            buffer.addIteration([example(i) for i in range(3)])
+            buffer.addIteration([example(i) for i in range(3, 7)])
+            self.assertEqual(5, len(buffer))
+            self.assertEqual([1, 4], buffer.iterations)
+            vs = [v for _, _, v in buffer.examples(shuffle=False)]
+            self.assertEqual([2.0, 3.0, 4.0, 5.0, 6.0], vs)
+
+    def test_evicts_whole_iterations(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(folder, 100)
+            for it in range(4):
+                buffer.addIteration([example(10 * it + i) for i in range(it + 1)], maxIterations=2)
+            self.assertEqual([3, 4], buffer.iterations)
+            vs = sorted(v for _, _, v in buffer.examples())
+            self.assertEqual([20.0, 21.0, 22.0, 30.0, 31.0, 32.0, 33.0], vs)
+
+    def test_overwrites_past_empty_iterations(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(folder, 4)
+            buffer.addIteration([example(i) for i in range(2)])
+            buffer.addIteration([])
+            buffer.addIteration([example(i) for i in range(2, 4)])
+            buffer.addIteration([example(i) for i in range(4, 7)])
+            self.assertEqual([1, 3], buffer.iterations)
+            buffer.addIteration([], maxIterations=3)
+            self.assertEqual(4, len(buffer))
+            self.assertEqual([1, 3, 0], buffer.iterations)
+            vs = [v for _, _, v in buffer.examples(shuffle=False)]
+            self.assertEqual([3.0, 4.0, 5.0, 6.0], vs)
+
+    def test_persists_across_restarts(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(folder, 4)
+            buffer.addIteration([example(i) for i in range(6)])
+            del buffer
+            buffer = ReplayBuffer(folder, 4)
+            self.assertEqual(4, len(buffer))
+            for i, (board, pi, v) in zip(range(2, 6), buffer.examples(shuffle=False)):
+                np.testing.assert_array_equal(example(i)[0], board)
+                np.testing.assert_allclose(example(i)[1], pi, rtol=1e-6)
+                self.assertEqual(i, v)
+            boards, pis, vs = buffer.sample(16, np.random.RandomState(0))
+            self.assertEqual((16, 3, 3), boards.shape)
+            self.assertTrue(set(vs) <= {2.0, 3.0, 4.0, 5.0})
+            with self.assertRaises(ValueError):
+                ReplayBuffer(folder, 8)
+
+    def test_crash_while_adding_keeps_older_examples(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(folder, 4)
+            buffer.addIteration([example(i) for i in range(4)])
+            bad = (example(6)[0], np.zeros(11), 6.0)  # pi too long, fails while the iteration is written
+            with self.assertRaises(ValueError):
+                buffer.addIteration([example(4), example(5), bad])
+            del buffer
+            buffer = ReplayBuffer(folder, 4)
+            self.assertEqual([1], buffer.iterations)
+            self.assertEqual([3.0], [v for _, _, v in buffer.examples(shuffle=False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from utils import ZobristKeys
 from .TicTacToeLogic import Board
 import numpy as np
 
@@ -14,9 +15,10 @@ Date: Jan 5, 2018.
 
 Based on the OthelloGame by Surag Nair.
 """
-class TicTacToeGame(Game):
+class TicTacToeGame(ZobristKeys, Game):
     def __init__(self, n=3):
         self.n = n
+        self.initZobrist(self.n * self.n)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -2,6 +2,7 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from utils import ZobristKeys
 from .TicTacToeLogic import Board
 import numpy as np
 
@@ -13,9 +14,10 @@ Date: Feb 05, 2020
 
 Based on the TicTacToeGame by Evgeny Tyurin.
 """
-class TicTacToeGame(Game):
+class TicTacToeGame(ZobristKeys, Game):
     def __init__(self, n):
         self.n = n
+        self.initZobrist(self.n * self.n * self.n)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class AverageMeter(object):
     """From https://github.com/pytorch/examples/blob/master/imagenet/main.py"""
 
@@ -19,4 +22,99 @@ class AverageMeter(object):
 
 class dotdict(dict):
     def __getattr__(self, name):
-        return self[name]
+        try:
+            return self[name]
+        except KeyError:
+            # AttributeError lets getattr(args, name, default) work for optional settings
+            raise AttributeError(name)
+
+
+class ZobristHash(object):
+    """
+    Zobrist hashing for boards of -1, 0 and 1 pieces. Every (piece, cell) pair
+    gets an independent random 64-bit key, empty cells get 0, and the hash of
+    a board is the XOR of the keys of all its cells, so placing or removing a
+    piece updates it with a single XOR.
+
+    The key of a board is its hash in the low 64 bits and the hash of -board
+    (the canonical form for the other player) in the high 64 bits, so negate
+    only swaps the halves and two different boards share a key with
+    probability 2^-64 whatever their colors.
+    """
+
+    def __init__(self, shape, seed=0):
+        rng = np.random.RandomState(seed)
+        self.cells = np.arange(int(np.prod(shape)))
+        white = rng.randint(0, 2 ** 64, size=len(self.cells), dtype=np.uint64)
+        black = rng.randint(0, 2 ** 64, size=len(self.cells), dtype=np.uint64)
+        self.table = np.stack([black, np.zeros_like(white), white])  # indexed by piece + 1
+        self.keys = {1: [int(w) | int(b) << 64 for w, b in zip(white, black)],
+                     -1: [int(b) | int(w) << 64 for w, b in zip(white, black)]}
+
+    def hash(self, board):
+        """
+        Returns:
+            key: the 128-bit Zobrist key of board as a python int
+        """
+        pieces = np.asarray(board).ravel().astype(np.intp) + 1
+        low = np.bitwise_xor.reduce(self.table[pieces, self.cells])
+        high = np.bitwise_xor.reduce(self.table[2 - pieces, self.cells])
+        return int(low) | int(high) << 64
+
+    def place(self, key, cell, piece):
+        """
+        Returns:
+            key: the key after piece was put on (or taken off) the flat index cell
+        """
+        return key ^ self.keys[piece][cell]
+
+    @staticmethod
+    def negate(key):
+        """
+        Returns:
+            key: the key of the board with every piece replaced by its opposite
+        """
+        return (key & 0xFFFFFFFFFFFFFFFF) << 64 | key >> 64
+
+
+class ZobristKeys(object):
+    """
+    Mixin for the Game of a board of -1, 0 and 1 pieces where an action puts
+    one piece on the cell with the same flat index, giving it the incremental
+    Zobrist keys described in Game.hashKey. List it before Game in the bases
+    and call initZobrist from __init__.
+    """
+
+    def initZobrist(self, passAction=None):
+        """
+        Input:
+            passAction: the action that passes, which leaves the key unchanged,
+                        or None if the game has none
+        """
+        self._zobrist = ZobristHash(self.getBoardSize())
+        self._passAction = passAction
+
+    def hashKey(self, board):
+        # 128-bit Zobrist key, much smaller than the board bytes as a dict key
+        return self._zobrist.hash(board)
+
+    def getNextHashKey(self, key, board, player, action):
+        # key of getNextState(board, player, action), updated with one XOR
+        if action == self._passAction:
+            return key
+        return self._zobrist.place(key, action, player)
+
+    def getCanonicalHashKey(self, key, player):
+        # key of getCanonicalForm(board, player) given the key of board
+        return key if player == 1 else self._zobrist.negate(key)
+
+
+class LastMoveBoard(np.ndarray):
+    """
+    Board array that remembers the action of the last stone placed on it, set
+    by the getNextState of games like Connect4Game and GobangGame, so that
+    getGameEnded only has to look at the lines through that stone. Arrays
+    derived from it by numpy operations (copies, rolls, products...) get
+    last_move None and are checked in full.
+    """
+    last_move = None